@@ -1,126 +1,230 @@
-from PIL import Image
 import numpy as np
 from matplotlib.colors import ListedColormap
 import os
-import pandas as pd
-import glob
-import matplotlib.pyplot as plt
-import matplotlib.gridspec as gridspec
+from matplotlib.figure import Figure
 from VARI import compute_vari_and_save
 from NDVI import compute_ndvi_from_images
+from raster_pyramid import build_pyramid, ViewportImage, relink_viewports
+from histogram_stats import (level_histogram, joint_histogram, combined_percentages, threshold_level,
+                             percent_at_or_above, plot_level_histogram)
+
+COMBINED_CLASS_NAMES = ('Non-Veg', 'Healthy', 'Potential Stress')
+
+class AnalysisCancelled(Exception):
+    """Raised when a running analysis is cancelled through its cancel_event."""
+
+
+def _checkpoint(progress, cancel_event, fraction, message):
+    if cancel_event is not None and cancel_event.is_set():
+        raise AnalysisCancelled(message)
+    if progress is not None:
+        progress(fraction, message)
+
+
+def combined_mask_for(ndvi_scaled, vari_scaled, ndvi_threshold, vari_threshold):
+    """
+    3-class uint8 mask from the quantised rasters: 0 non-vegetated (NDVI below
+    threshold), 1 healthy (NDVI and VARI at or above), 2 potential stress
+    (NDVI at or above, VARI below). Thresholds are on the 0–1 display scale.
+    """
+    ndvi_ok = (ndvi_scaled >= threshold_level(ndvi_threshold)).view(np.uint8)
+    vari_low = (vari_scaled < threshold_level(vari_threshold)).view(np.uint8)
+    return ndvi_ok * (1 + vari_low)
+
+
+class CombinedMaskLevels:
+    """
+    Pyramid of the combined mask for ViewportImage, computed per level on
+    first access from nearest-sampled NDVI/VARI pyramids (sampling commutes
+    with the per-pixel mask, so level k equals build_pyramid(mask)[k]).
+    set_thresholds drops the computed levels; only the level on screen is
+    rebuilt, so re-thresholding a zoomed-out 12-MP map touches ~0.1 MP.
+    """
+
+    def __init__(self, ndvi_scaled, vari_scaled, ndvi_threshold, vari_threshold):
+        self.ndvi_levels = build_pyramid(ndvi_scaled, categorical=True)
+        self.vari_levels = build_pyramid(vari_scaled, categorical=True)
+        self.shapes = [level.shape for level in self.ndvi_levels]
+        self.thresholds = (ndvi_threshold, vari_threshold)
+        self._masks = {}
+
+    def __len__(self):
+        return len(self.ndvi_levels)
+
+    def __getitem__(self, level):
+        mask = self._masks.get(level)
+        if mask is None:
+            mask = combined_mask_for(self.ndvi_levels[level], self.vari_levels[level], *self.thresholds)
+            self._masks[level] = mask
+        return mask
+
+    def arrays(self):
+        return self.ndvi_levels + self.vari_levels + list(self._masks.values())
+
+    def set_thresholds(self, ndvi_threshold, vari_threshold):
+        if (ndvi_threshold, vari_threshold) != self.thresholds:
+            self.thresholds = (ndvi_threshold, vari_threshold)
+            self._masks = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_masks"] = {}  # Cheap to recompute; keeps cached figures small
+        return state
+
+
+def _threshold_legend(ax, ndvi_hist, vari_hist, ndvi_threshold, vari_threshold):
+    ndvi_line, vari_line = ax.threshold_lines
+    ndvi_line.set_xdata([ndvi_threshold, ndvi_threshold])
+    vari_line.set_xdata([vari_threshold, vari_threshold])
+    ndvi_line.set_label(f"NDVI Threshold ({percent_at_or_above(ndvi_hist, ndvi_threshold):.0f}% above)")
+    vari_line.set_label(f"VARI Threshold ({percent_at_or_above(vari_hist, vari_threshold):.0f}% above)")
+    ax.legend(fontsize=6, loc='upper left')
+
+
+def apply_thresholds(fig, results, ndvi_threshold, vari_threshold):
+    """
+    Re-thresholds a figure from combined_ndvi_vari_analysis in place: the
+    combined map is rebuilt for the region on screen only, the histogram
+    threshold lines move, and the class shares come from the joint histogram
+    without touching the pixels. Returns the combined class percentages
+    (COMBINED_CLASS_NAMES order). The caller redraws the canvas (draw_idle).
+    The CSV logs and cached results keep the thresholds of the original run;
+    a cache hit re-applies them, since the cache hands out this same figure.
+    """
+    combined_view = fig.viewports[1]
+    combined_view.levels.set_thresholds(ndvi_threshold, vari_threshold)
+    combined_view.refresh()
+    _threshold_legend(fig.histogram_ax, results['ndvi_hist'], results['vari_hist'], ndvi_threshold, vari_threshold)
+    return combined_percentages(results['joint_hist'], ndvi_threshold, vari_threshold)
+
 
 def combined_ndvi_vari_analysis(rgb_image_path, nir_image_path,
-                                ndvi_folders=None, vari_folder=None,
-                                ndvi_threshold=0.55, vari_threshold=0.175):
+                                ndvi_folder='ndvi_outputs_date', vari_folder='vari_outputs_date',
+                                ndvi_threshold=0.55, vari_threshold=0.175,
+                                sink=None, save_outputs=True, cache=None,
+                                progress=None, cancel_event=None, index_store=None):
     """
     Performs combined NDVI and VARI analysis using RGB and NIR images.
-    Returns the matplotlib figure for embedding in GUI.
+    The index arrays are used straight from memory; PNG/CSV outputs go to
+    sink (written synchronously when no sink is given).
+    Returns (figure, results) for embedding in GUI, where results holds the
+    'ndvi'/'vari' uint8 arrays, their 256-bin 'ndvi_hist'/'vari_hist' and
+    256x256 'joint_hist' (see histogram_stats), the thresholds used,
+    'combined_pct' (class shares of the combined mask) and
+    'ndvi_stats'/'vari_stats' dicts, or (None, None) if the analysis failed.
+    apply_thresholds re-thresholds the returned figure interactively.
+    With a result_cache.ResultCache, an unchanged image pair analysed with the
+    same thresholds is served from the cache without recomputing or
+    logging duplicate CSV rows.
+    progress(fraction, message) is called as each stage starts, and setting
+    cancel_event (a threading.Event) raises AnalysisCancelled at the next
+    stage boundary; outputs of stages already finished are kept.
+    An index_store.IndexStore keeps the NDVI/VARI rasters as memory-mapped
+    .npy files, so images analysed before (e.g. with other thresholds) are
+    not decoded again.
+    The figure is a plain matplotlib Figure (not registered with pyplot), so
+    this function can run on a worker thread. The NDVI and combined maps are
+    drawn from raster pyramids (fig.viewports), showing only the level and
+    region that fit the view and loading finer tiles on zoom and pan.
     """
-    # Set base folder explicitly
-    base_folder = r"S:\RVCE\4th_sem\MCP\PBL\Display"
-    base_name = os.path.splitext(os.path.basename(rgb_image_path))[0]
+    _checkpoint(progress, cancel_event, 0.0, "Checking cache")
+    cache_key = None
+    if cache is not None:
+        try:
+            cache_key = cache.key_for(rgb_image_path, nir_image_path, ndvi_threshold, vari_threshold)
+        except OSError as e:
+            print(f"Cache lookup skipped: {e}")
+        if cache_key is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                print(f"♻️ Using cached analysis for {os.path.basename(rgb_image_path)}")
+                fig, results = cached
+                relink_viewports(fig)  # Callbacks do not survive the disk cache
+                # The memory tier returns the live figure, which the GUI may have re-thresholded
+                apply_thresholds(fig, results, results['ndvi_threshold'], results['vari_threshold'])
+                return fig, results
 
     # Run NDVI and VARI computations
-    compute_vari_and_save(rgb_image_path)
-    compute_ndvi_from_images(rgb_image_path, nir_image_path)
-
-    # Auto-find NDVI/VARI output folders
-    if ndvi_folders is None:
-        ndvi_folders = sorted(glob.glob(os.path.join(base_folder, "ndvi_output*")), reverse=True)
-    if vari_folder is None:
-        vari_folder = os.path.join(base_folder, "vari_outputs_date")
-
-    if not ndvi_folders:
-        print("No NDVI output folder found.")
-        return None
-
-    ndvi_folder = ndvi_folders[0]
-
-    # Validate folder existence
-    if not os.path.exists(ndvi_folder):
-        print(f"NDVI folder does not exist: {ndvi_folder}")
-        return None
-    if not os.path.exists(vari_folder):
-        print(f"VARI folder does not exist: {vari_folder}")
-        return None
-
-    # Debug: list files in folder
-    print("Files in NDVI folder:", os.listdir(ndvi_folder))
-    print("Files in VARI folder:", os.listdir(vari_folder))
-
-    # Auto-find NDVI and VARI image paths
-    def find_image(folder, base_name, indicator):
-        for file in os.listdir(folder):
-            fname = file.lower()
-            if fname == f"{indicator}_{base_name.lower()}.png" or \
-               fname == f"{base_name.lower()}_{indicator}.png":
-                return os.path.join(folder, file)
-        return None
-
-    ndvi_img_path = find_image(ndvi_folder, base_name, "ndvi")
-    vari_img_path = find_image(vari_folder, base_name, "vari")
-
-    if ndvi_img_path is None:
-        print(f"NDVI image for {base_name} not found in {ndvi_folder}.")
-        return None
-    if vari_img_path is None:
-        print(f"VARI image for {base_name} not found in {vari_folder}.")
-        return None
-
-    # Load CSV stats
-    ndvi_csv_path = os.path.join(base_folder, "ndvi_analysis_date.csv")
-    if not os.path.exists(ndvi_csv_path):
-        print(f"NDVI CSV not found: {ndvi_csv_path}")
-        return None
-
-    # Load grayscale images
-    ndvi_img = Image.open(ndvi_img_path).convert('L')
-    vari_img = Image.open(vari_img_path).convert('L')
-    ndvi_array = np.array(ndvi_img) / 255.0
-    vari_array = np.array(vari_img) / 255.0
-
-    # Load CSV stats
-    ndvi_df = pd.read_csv(ndvi_csv_path)
-    ndvi_stats = ndvi_df.iloc[-1]
-
-    # Combined mask generation
-    combined_mask = np.zeros_like(ndvi_array)
-    combined_mask[(ndvi_array >= ndvi_threshold) & (vari_array >= vari_threshold)] = 1
-    combined_mask[(ndvi_array >= ndvi_threshold) & (vari_array < vari_threshold)] = 2
+    _checkpoint(progress, cancel_event, 0.1, "Computing VARI")
+    vari_scaled, vari_stats = compute_vari_and_save(rgb_image_path, output_folder=vari_folder,
+                                                    update_csv=save_outputs, save_image=save_outputs,
+                                                    sink=sink, index_store=index_store)
+    _checkpoint(progress, cancel_event, 0.35, "Computing NDVI")
+    ndvi_scaled, ndvi_stats = compute_ndvi_from_images(rgb_image_path, nir_image_path,
+                                                       output_folder=ndvi_folder,
+                                                       update_csv=save_outputs, save_image=save_outputs,
+                                                       sink=sink, index_store=index_store)
+
+    if vari_scaled is None or ndvi_scaled is None:
+        print("NDVI/VARI computation failed, see messages above.")
+        return None, None
+    if ndvi_scaled.shape != vari_scaled.shape:
+        print(f"NDVI {ndvi_scaled.shape} and VARI {vari_scaled.shape} image sizes differ.")
+        return None, None
+
+    # Combined mask (built lazily per pyramid level) and the histograms behind its stats
+    _checkpoint(progress, cancel_event, 0.6, "Building combined mask")
+    mask_levels = CombinedMaskLevels(ndvi_scaled, vari_scaled, ndvi_threshold, vari_threshold)
+    ndvi_hist = level_histogram(ndvi_scaled)
+    vari_hist = level_histogram(vari_scaled)
+    joint_hist = joint_histogram(ndvi_scaled, vari_scaled)
 
     # Create ONE figure
-    fig, axs = plt.subplots(1, 3, figsize=(12, 4), dpi=150)
+    _checkpoint(progress, cancel_event, 0.7, "Rendering figure")
+    fig = Figure(figsize=(12, 4), dpi=150)
+    axs = fig.subplots(1, 3)
 
     # ---------- NDVI Plot ----------
-    im1 = axs[0].imshow(ndvi_array, cmap='RdYlGn', vmin=0, vmax=1)
-    axs[0].set_title(f"NDVI: {os.path.basename(ndvi_img_path)}", fontsize=10)
+    ndvi_view = ViewportImage(axs[0], build_pyramid(ndvi_scaled), scale=1 / 255.0,
+                              cmap='RdYlGn', vmin=0, vmax=1)
+    axs[0].set_title(f"NDVI: {ndvi_stats['NDVI Image']}", fontsize=10)
     axs[0].axis('off')
-    fig.colorbar(im1, ax=axs[0], fraction=0.046, pad=0.04)
+    fig.colorbar(ndvi_view.image, ax=axs[0], fraction=0.046, pad=0.04)
 
     # ---------- Combined NDVI + VARI Plot ----------
     cmap_combined = ListedColormap(['red', 'green', 'blue'])
-    im_combined = axs[1].imshow(combined_mask, cmap=cmap_combined, vmin=0, vmax=2)
+    combined_view = ViewportImage(axs[1], mask_levels, cmap=cmap_combined, vmin=0, vmax=2)
     axs[1].set_title("NDVI + VARI Combined", fontsize=10)
     axs[1].axis('off')
-    cbar_combined = fig.colorbar(im_combined, ax=axs[1], ticks=[0, 1, 2], fraction=0.046, pad=0.04)
-    cbar_combined.ax.set_yticklabels(['Non-Veg', 'Healthy', 'Potential Stress'], fontsize=7)
-
-    # ---------- Histogram ----------
-    axs[2].hist(ndvi_array.flatten(), bins=50, alpha=0.5, label='NDVI', color='green')
-    axs[2].hist(vari_array.flatten(), bins=50, alpha=0.5, label='VARI', color='orange')
-    axs[2].axvline(ndvi_threshold, color='green', linestyle='--', label='NDVI Threshold')
-    axs[2].axvline(vari_threshold, color='orange', linestyle='--', label='VARI Threshold')
+    cbar_combined = fig.colorbar(combined_view.image, ax=axs[1], ticks=[0, 1, 2], fraction=0.046, pad=0.04)
+    cbar_combined.ax.set_yticklabels(COMBINED_CLASS_NAMES, fontsize=7)
+
+    # ---------- Histogram (pre-binned from the 256-level histograms) ----------
+    plot_level_histogram(axs[2], ndvi_hist, bins=50, alpha=0.5, label='NDVI', color='green')
+    plot_level_histogram(axs[2], vari_hist, bins=50, alpha=0.5, label='VARI', color='orange')
+    axs[2].threshold_lines = (axs[2].axvline(ndvi_threshold, color='green', linestyle='--'),
+                              axs[2].axvline(vari_threshold, color='orange', linestyle='--'))
     axs[2].set_title("Threshold Histogram", fontsize=10)
     axs[2].set_xlabel("Value", fontsize=8)
     axs[2].set_ylabel("Pixel Count", fontsize=8)
     axs[2].tick_params(axis='both', which='major', labelsize=7)
-    axs[2].legend(fontsize=6, loc='upper left')
-
-    plt.tight_layout(pad=1.0)
-    return fig
+    _threshold_legend(axs[2], ndvi_hist, vari_hist, ndvi_threshold, vari_threshold)
+
+    fig.tight_layout(pad=1.0)
+    fig.viewports = [ndvi_view, combined_view]
+    fig.histogram_ax = axs[2]
+    relink_viewports(fig)  # Pick the levels for the final layout
+
+    results = {
+        "ndvi": ndvi_scaled,
+        "vari": vari_scaled,
+        "ndvi_hist": ndvi_hist,
+        "vari_hist": vari_hist,
+        "joint_hist": joint_hist,
+        "ndvi_threshold": ndvi_threshold,
+        "vari_threshold": vari_threshold,
+        "combined_pct": combined_percentages(joint_hist, ndvi_threshold, vari_threshold),
+        "ndvi_stats": ndvi_stats,
+        "vari_stats": vari_stats
+    }
+    if cache_key is not None:
+        _checkpoint(progress, cancel_event, 0.9, "Saving to cache")
+        cache.put(cache_key, fig, results)
+    if progress is not None:
+        progress(1.0, "Done")
+    return fig, results
 
 if __name__ == "__main__":
-    compute_vari_and_save(r"RGB_Images\Test_1_RGB.jpg")
-    compute_ndvi_from_images(r"S:\RVCE\4th_sem\MCP\PBL\Display\RGB_Images\Test_1_RGB.jpg",
-                             r"NIR_Images\Test_1_NIR.jpg")
-    combined_ndvi_vari_analysis(r"RGB_Images\Test_1_RGB.jpg", r"NIR_Images\Test_1_NIR.jpg")
\ No newline at end of file
+    fig, _ = combined_ndvi_vari_analysis(r"RGB_Images\Test_1_RGB.jpg", r"NIR_Images\Test_1_NIR.jpg")
+    if fig is not None:
+        fig.savefig("combined_analysis_Test_1.png")
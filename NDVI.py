@@ -1,58 +1,76 @@
 from PIL import Image
 import numpy as np
 import os
-import pandas as pd
 from datetime import datetime
+from results_store import NDVI_COLUMNS
+from output_sink import SYNC_SINK
+from index_kernels import ndvi_kernel
+from histogram_stats import summarize_histogram, level_histogram, NDVI_LEVEL_CLASSES
 
 def compute_ndvi_from_images(
         rgb_image_path,
         nir_image_path,
         output_folder='ndvi_outputs_date',
-        csv_path='ndvi_analysis_date.csv'
+        csv_path='ndvi_analysis_date.csv',
+        update_csv=True,
+        verbose=True,
+        save_image=True,
+        sink=None,
+        index_store=None
     ):
     """
     Computes NDVI from a single RGB image and a NIR image.
     Saves the NDVI heatmap, computes statistics, and updates the CSV log.
+    Returns (ndvi_scaled uint8 array, statistics dict), or (None, None) if an
+    input image is missing.
+    Pass update_csv=False to leave the CSV untouched (e.g. batch runs
+    that write all rows at the end), and an output_sink.AsyncSink as sink
+    to do the PNG encode and CSV append in the background.
+    With an index_store.IndexStore, an image pair seen before is served as a
+    read-only memmap of the stored raster without decoding either image.
     """
+    sink = sink or SYNC_SINK
 
     os.makedirs(output_folder, exist_ok=True)
 
     if not os.path.exists(rgb_image_path):
         print(f"❌ RGB image '{rgb_image_path}' not found.")
-        return
+        return None, None
     if not os.path.exists(nir_image_path):
         print(f"❌ NIR image '{nir_image_path}' not found.")
-        return
+        return None, None
 
-    # === Load RGB and NIR images ===
-    rgb_img = Image.open(rgb_image_path).convert('RGB')
-    nir_img = Image.open(nir_image_path).convert('L')
+    # === Reuse the stored raster of this image pair if there is one ===
+    ndvi_scaled = None
+    if index_store is not None:
+        store_key = index_store.key_for("ndvi", rgb_image_path, nir_image_path)
+        ndvi_scaled = index_store.get("ndvi", store_key)
 
-    red = np.asarray(rgb_img)[..., 0].astype(float) / 255.0
-    nir = np.asarray(nir_img).astype(float) / 255.0
+    if ndvi_scaled is not None:
+        ndvi_hist = level_histogram(ndvi_scaled)
+    else:
+        # === Load RGB and NIR images ===
+        rgb_img = Image.open(rgb_image_path).convert('RGB')
+        nir_img = Image.open(nir_image_path).convert('L')
 
-    # === Compute NDVI ===
-    ndvi = (nir - red) / (nir + red + 1e-5)
+        red = np.asarray(rgb_img)[..., 0]
+        nir = np.asarray(nir_img)
 
-    # === Scale to 0–255 and save image ===
-    ndvi_scaled = ((ndvi + 1) / 2 * 255).astype(np.uint8)
-    ndvi_image = Image.fromarray(ndvi_scaled)
+        # === Compute NDVI (quantised 0–255) and its histogram in one pass ===
+        ndvi_scaled, ndvi_hist = ndvi_kernel(red, nir)
+        if index_store is not None:
+            index_store.put("ndvi", store_key, ndvi_scaled)
 
+    # === Save image ===
     base_name = os.path.splitext(os.path.basename(rgb_image_path))[0]
     output_image_name = f"{base_name}_ndvi.png"
     output_image_path = os.path.join(output_folder, output_image_name)
-    ndvi_image.save(output_image_path)
-
-    # === Rescale for consistent analysis ===
-    ndvi = (ndvi_scaled / 255.0) * 2 - 1
+    if save_image:
+        sink.save_image(ndvi_scaled, output_image_path)
 
-    # === Compute statistics ===
-    mean_ndvi = np.mean(ndvi)
-    total_pixels = ndvi.size
-    healthy = (ndvi > 0.6)
-    moderate = (ndvi > 0.2) & (ndvi <= 0.6)
-    sparse = (ndvi >= 0.0) & (ndvi <= 0.2)
-    barren = (ndvi < 0.0)
+    # === Compute statistics from the histogram of the saved levels ===
+    mean_ndvi, (healthy_pct, moderate_pct, sparse_pct, barren_pct) = \
+        summarize_histogram(ndvi_hist, NDVI_LEVEL_CLASSES)
 
     upload_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -62,21 +80,18 @@ def compute_ndvi_from_images(
         "NIR Image": os.path.basename(nir_image_path),
         "NDVI Image": output_image_name,
         "Mean NDVI": mean_ndvi,
-        "Healthy (%)": (np.sum(healthy) / total_pixels) * 100,
-        "Moderate (%)": (np.sum(moderate) / total_pixels) * 100,
-        "Sparse (%)": (np.sum(sparse) / total_pixels) * 100,
-        "Non-Vegetated (%)": (np.sum(barren) / total_pixels) * 100
+        "Healthy (%)": healthy_pct,
+        "Moderate (%)": moderate_pct,
+        "Sparse (%)": sparse_pct,
+        "Non-Vegetated (%)": barren_pct
     }
 
     # === Update CSV ===
-    df_new = pd.DataFrame([stats])
-    if os.path.exists(csv_path):
-        df_existing = pd.read_csv(csv_path)
-        df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-    else:
-        df_combined = df_new
+    if update_csv:
+        sink.append_row(csv_path, stats, NDVI_COLUMNS)
 
-    df_combined.to_csv(csv_path, index=False)
+    if not verbose:
+        return ndvi_scaled, stats
 
     # === Console Report ===
     print(f"\n📊 NDVI Analysis for {os.path.basename(rgb_image_path)} and {os.path.basename(nir_image_path)}:")
@@ -86,8 +101,11 @@ def compute_ndvi_from_images(
     print(f"- Moderate Vegetation (0.2–0.6): {stats['Moderate (%)']:.2f}%")
     print(f"- Sparse Vegetation (0–0.2): {stats['Sparse (%)']:.2f}%")
     print(f"- Non-Vegetated (<0): {stats['Non-Vegetated (%)']:.2f}%")
-    print(f"✅ Saved NDVI image to: {output_image_path}")
-    print(f"✅ Analysis results updated in: {csv_path}")
+    if save_image:
+        print(f"✅ Saved NDVI image to: {output_image_path}")
+    if update_csv:
+        print(f"✅ Analysis results updated in: {csv_path}")
+    return ndvi_scaled, stats
 
 if __name__ == "__main__":
     compute_ndvi_from_images("RGB_Images\\Test_1_RGB.jpg", "NIR_Images\\Test_1_NIR.jpg")
\ No newline at end of file
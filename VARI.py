@@ -1,58 +1,63 @@
 from PIL import Image
 import numpy as np
-import matplotlib.pyplot as plt
 import os
-import pandas as pd
 from datetime import datetime
+from results_store import VARI_COLUMNS
+from output_sink import SYNC_SINK
+from index_kernels import vari_kernel
+from histogram_stats import summarize_histogram, level_histogram, VARI_LEVEL_CLASSES
 
 # ========== Configuration ==========
 output_folder = 'vari_outputs_date'
 csv_path = 'vari_analysis_date.csv'
 
-os.makedirs(output_folder, exist_ok=True)
+def compute_vari_and_save(img_path='test2.jpg', output_folder=output_folder, csv_path=csv_path,
+                          update_csv=True, verbose=True, save_image=True, sink=None, index_store=None):
+    """
+    Computes VARI for a single RGB image, saves the heatmap and logs the stats.
+    Returns (vari_scaled uint8 array, statistics dict), or (None, None) if the
+    image is missing.
+    Pass update_csv=False to leave the CSV untouched (e.g. batch runs
+    that write all rows at the end), and an output_sink.AsyncSink as sink
+    to do the PNG encode and CSV append in the background.
+    With an index_store.IndexStore, an image seen before is served as a
+    read-only memmap of the stored raster without decoding it.
+    """
+    sink = sink or SYNC_SINK
 
-def compute_vari_and_save(img_path='test2.jpg'):
     if not os.path.exists(img_path):
         print(f"❌ Error: Image '{img_path}' not found.")
-        return
+        return None, None
 
-    # === Load RGB image ===
-    rgb_img = Image.open(img_path).convert('RGB')
-    rgb = np.asarray(rgb_img).astype(float)
+    os.makedirs(output_folder, exist_ok=True)
 
-    red = rgb[..., 0]
-    green = rgb[..., 1]
-    blue = rgb[..., 2]
+    # === Reuse the stored raster of this image if there is one ===
+    vari_scaled = None
+    if index_store is not None:
+        store_key = index_store.key_for("vari", img_path)
+        vari_scaled = index_store.get("vari", store_key)
 
-    # === Compute VARI ===
-    vari = (green - red) / (green + red - blue + 1e-5)
+    if vari_scaled is not None:
+        vari_hist = level_histogram(vari_scaled)
+    else:
+        # === Load RGB image ===
+        rgb_img = Image.open(img_path).convert('RGB')
+        rgb = np.asarray(rgb_img)
 
-    # === Plot and Save Heatmap ===
-    '''plt.figure(figsize=(8, 6))
-    plt.imshow(vari, cmap='RdYlGn', vmin=-1, vmax=1)
-    plt.colorbar(label='VARI')
-    plt.title('VARI Heatmap')
-    plt.axis('off')
-    plt.show()'''
+        # === Compute VARI (quantised 0–255) and its histogram in one pass ===
+        vari_scaled, vari_hist = vari_kernel(rgb)
+        if index_store is not None:
+            index_store.put("vari", store_key, vari_scaled)
 
     # === Save Heatmap as Image ===
-    vari_scaled = ((vari + 1) / 2 * 255).astype(np.uint8)
-    vari_image = Image.fromarray(vari_scaled)
     output_image_name = f"vari_{os.path.splitext(os.path.basename(img_path))[0]}.png"
     output_image_path = os.path.join(output_folder, output_image_name)
-    vari_image.save(output_image_path)
-
-    # === Reload for Consistency ===
-    vari_scaled = np.array(Image.open(output_image_path).convert('L')).astype(float)
-    vari = (vari_scaled / 255.0) * 2 - 1
+    if save_image:
+        sink.save_image(vari_scaled, output_image_path)
 
-    # === Compute Statistics ===
-    mean_vari = np.mean(vari)
-    total_pixels = vari.size
-    healthy = (vari > 0.5)
-    moderate = (vari > 0.2) & (vari <= 0.5)
-    sparse = (vari >= 0.0) & (vari <= 0.2)
-    barren = (vari < 0.0)
+    # === Compute Statistics from the histogram of the saved levels ===
+    mean_vari, (healthy_pct, moderate_pct, sparse_pct, barren_pct) = \
+        summarize_histogram(vari_hist, VARI_LEVEL_CLASSES)
 
     upload_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -60,20 +65,18 @@ def compute_vari_and_save(img_path='test2.jpg'):
         "DateTime": upload_datetime,
         "Image Name": os.path.basename(img_path),
         "Mean VARI": mean_vari,
-        "Healthy (%)": (np.sum(healthy) / total_pixels) * 100,
-        "Moderate (%)": (np.sum(moderate) / total_pixels) * 100,
-        "Sparse (%)": (np.sum(sparse) / total_pixels) * 100,
-        "Non-Vegetated (%)": (np.sum(barren) / total_pixels) * 100
+        "Healthy (%)": healthy_pct,
+        "Moderate (%)": moderate_pct,
+        "Sparse (%)": sparse_pct,
+        "Non-Vegetated (%)": barren_pct
     }
 
     # === Save to CSV ===
-    df_new = pd.DataFrame([stats])
-    if os.path.exists(csv_path):
-        df_existing = pd.read_csv(csv_path)
-        df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-    else:
-        df_combined = df_new
-    df_combined.to_csv(csv_path, index=False)
+    if update_csv:
+        sink.append_row(csv_path, stats, VARI_COLUMNS)
+
+    if not verbose:
+        return vari_scaled, stats
 
     # === Console Report ===
     print(f"\n📊 VARI Analysis for Image: {os.path.basename(img_path)}")
@@ -83,9 +86,11 @@ def compute_vari_and_save(img_path='test2.jpg'):
     print(f"- Moderate Vegetation (0.2–0.5): {stats['Moderate (%)']:.2f}%")
     print(f"- Sparse Vegetation (0–0.2): {stats['Sparse (%)']:.2f}%")
     print(f"- Non-Vegetated (<0): {stats['Non-Vegetated (%)']:.2f}%")
-    print(f"✅ VARI image saved to: {output_image_path}")
-    print(f"✅ Analysis results updated in: {csv_path}")
-pass
+    if save_image:
+        print(f"✅ VARI image saved to: {output_image_path}")
+    if update_csv:
+        print(f"✅ Analysis results updated in: {csv_path}")
+    return vari_scaled, stats
 
 if __name__ == "__main__":
     compute_vari_and_save("RGB_Images\\Test_1_RGB.jpg")
\ No newline at end of file
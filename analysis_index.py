@@ -0,0 +1,212 @@
+"""
+Indexed history of NDVI/VARI analyses.
+
+The CSV logs (results_store.py) stay the append-only export; this SQLite
+index is what the dashboard queries. Each analysis is one row keyed by
+image id and capture time, with indexes on (image_id, captured_at) and
+(field, captured_at), so exact lookups, the latest result per field and
+per-field NDVI trends over a date range never scan the whole history.
+
+    image id     file name without extension and without the _RGB suffix
+                 ("Test_1_RGB.jpg" -> "Test_1"; never matches "Test_10")
+    field        given by the caller, or the image id without its trailing
+                 number ("north_12" -> "north")
+    captured_at  EXIF DateTimeOriginal, else the file's modification time
+                 (else the analysis time), stored as 'YYYY-MM-DD HH:MM:SS' text
+"""
+import os
+import re
+import csv
+import sqlite3
+import threading
+from datetime import datetime
+from results_store import NDVI_COLUMNS
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+EXIF_IFD = 0x8769
+
+# Index column -> NDVI stats key (see results_store.NDVI_COLUMNS)
+_NDVI_FIELDS = {
+    "analyzed_at": "DateTime",
+    "rgb_image": "RGB Image",
+    "nir_image": "NIR Image",
+    "ndvi_image": "NDVI Image",
+    "mean_ndvi": "Mean NDVI",
+    "healthy": "Healthy (%)",
+    "moderate": "Moderate (%)",
+    "sparse": "Sparse (%)",
+    "non_vegetated": "Non-Vegetated (%)",
+}
+
+
+def image_id_for(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r"_RGB$", "", name, flags=re.IGNORECASE)
+
+
+def field_for(image_id):
+    return re.sub(r"[_-]?\d+$", "", image_id) or image_id
+
+
+def capture_time(path):
+    """
+    Capture time of an image as TIME_FORMAT text (EXIF, else file mtime), or None.
+    """
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            exif = img.getexif()
+            value = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+        if value:
+            return datetime.strptime(value.strip("\x00 "), "%Y:%m:%d %H:%M:%S").strftime(TIME_FORMAT)
+    except (OSError, ValueError):
+        pass
+    try:
+        return datetime.fromtimestamp(os.path.getmtime(path)).strftime(TIME_FORMAT)
+    except OSError:
+        return None
+
+
+def _as_text(value):
+    return value.strftime(TIME_FORMAT) if isinstance(value, datetime) else value
+
+
+class AnalysisIndex:
+    def __init__(self, db_path='analysis_index.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                "image_id TEXT NOT NULL, field TEXT NOT NULL, captured_at TEXT NOT NULL, "
+                "analyzed_at TEXT, rgb_image TEXT, nir_image TEXT, ndvi_image TEXT, "
+                "mean_ndvi REAL, healthy REAL, moderate REAL, sparse REAL, non_vegetated REAL, "
+                "mean_vari REAL, PRIMARY KEY (image_id, captured_at))")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_field ON analyses (field, captured_at)")
+
+    # ========== Writes ==========
+    def record(self, ndvi_stats, vari_stats=None, rgb_path=None, field=None, captured_at=None):
+        """
+        Adds (or replaces, for the same image and capture time) one analysis.
+        ndvi_stats/vari_stats are the dicts returned by NDVI.py / VARI.py; rgb_path
+        is the analysed image (its capture time is read from it). Returns the image id.
+        """
+        return self.record_many([(ndvi_stats, vari_stats, rgb_path)], field=field, captured_at=captured_at)[0]
+
+    def record_many(self, entries, field=None, captured_at=None):
+        """
+        entries: iterable of (ndvi_stats, vari_stats or None, rgb_path or None),
+        written in one transaction. Returns the image ids.
+        """
+        rows, ids = [], []
+        for ndvi_stats, vari_stats, rgb_path in entries:
+            image_id = image_id_for(rgb_path or ndvi_stats["RGB Image"])
+            when = (_as_text(captured_at) or (rgb_path and capture_time(rgb_path))
+                    or ndvi_stats["DateTime"])
+            values = {column: ndvi_stats.get(key) for column, key in _NDVI_FIELDS.items()}
+            values["mean_vari"] = vari_stats.get("Mean VARI") if vari_stats else None
+            rows.append((image_id, field or field_for(image_id), when) + tuple(values.values()))
+            ids.append(image_id)
+
+        columns = ("image_id", "field", "captured_at") + tuple(_NDVI_FIELDS) + ("mean_vari",)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO analyses ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})", rows)
+        return ids
+
+    def import_csv(self, ndvi_csv_path, field=None):
+        """
+        Backfills the index from an existing NDVI CSV log. Returns the number of rows imported.
+        """
+        with open(ndvi_csv_path, newline="", encoding="utf-8") as f:
+            rows = [row for row in csv.DictReader(f) if row.get("RGB Image")]
+        entries = []
+        for row in rows:
+            stats = {key: row.get(key) for key in NDVI_COLUMNS}
+            for key in NDVI_COLUMNS[4:]:
+                stats[key] = float(stats[key]) if stats[key] not in (None, "") else None
+            entries.append((stats, None, None))  # Images may be gone; the analysis time stands in
+        self.record_many(entries, field=field)
+        return len(entries)
+
+    # ========== Queries ==========
+    def _stats(self, row):
+        # Row in the same shape as the NDVI stats dicts, plus index metadata
+        if row is None:
+            return None
+        stats = {key: row[column] for column, key in _NDVI_FIELDS.items()}
+        stats.update({"Image ID": row["image_id"], "Field": row["field"],
+                      "Captured": row["captured_at"], "Mean VARI": row["mean_vari"]})
+        return stats
+
+    def lookup(self, image):
+        """
+        Latest analysis of exactly this image (path or image id), or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM analyses WHERE image_id = ? ORDER BY captured_at DESC LIMIT 1",
+                (image_id_for(image),)).fetchone()
+        return self._stats(row)
+
+    def latest_per_field(self):
+        """
+        The most recent analysis of every field, ordered by field name.
+        """
+        with self._lock:
+            # SQLite returns the bare columns of the row holding max(captured_at)
+            rows = self._conn.execute(
+                "SELECT *, max(captured_at) FROM analyses GROUP BY field ORDER BY field").fetchall()
+        return [self._stats(row) for row in rows]
+
+    def trend(self, field, start=None, end=None):
+        """
+        Daily mean NDVI for a field between start and end (datetimes or
+        TIME_FORMAT text, both optional). Returns a list of (date, mean NDVI, analyses).
+        """
+        start = _as_text(start) or "0000"
+        end = _as_text(end) or "9999"
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT substr(captured_at, 1, 10) AS day, avg(mean_ndvi), count(*) FROM analyses "
+                "WHERE field = ? AND captured_at BETWEEN ? AND ? GROUP BY day ORDER BY day",
+                (field, start, end)).fetchall()
+        return [(datetime.strptime(day, "%Y-%m-%d"), mean, count) for day, mean, count in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query or backfill the NDVI/VARI analysis index")
+    parser.add_argument("--db", default="analysis_index.db")
+    parser.add_argument("--import-csv", metavar="NDVI_CSV", help="Backfill from an NDVI CSV log")
+    parser.add_argument("--lookup", metavar="IMAGE", help="Latest analysis of one image")
+    parser.add_argument("--trend", metavar="FIELD", help="Daily mean NDVI of one field")
+    args = parser.parse_args()
+
+    index = AnalysisIndex(args.db)
+    if args.import_csv:
+        print(f"✅ Imported {index.import_csv(args.import_csv)} rows from {args.import_csv}")
+    if args.lookup:
+        print(index.lookup(args.lookup) or f"❌ No analysis for {args.lookup}")
+    if args.trend:
+        for day, mean, count in index.trend(args.trend):
+            print(f"{day:%Y-%m-%d}  {mean:.3f}  ({count} analyses)")
+    if not (args.import_csv or args.lookup or args.trend):
+        for stats in index.latest_per_field():
+            print(f"📊 {stats['Field']}: {stats['Image ID']} captured {stats['Captured']}, "
+                  f"mean NDVI {stats['Mean NDVI']:.3f}")
+    index.close()
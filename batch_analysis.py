@@ -0,0 +1,156 @@
+import os
+import re
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from results_store import ResultsStore, NDVI_COLUMNS, VARI_COLUMNS
+from analysis_index import AnalysisIndex
+from NDVI import compute_ndvi_from_images
+from VARI import compute_vari_and_save
+from index_store import IndexStore
+
+# Matches e.g. "Test_12_RGB.jpg" -> name "Test_12"
+RGB_PATTERN = re.compile(r"^(?P<name>.+)_RGB\.(?P<ext>jpe?g|png)$", re.IGNORECASE)
+IMAGE_EXTENSIONS = ("jpg", "jpeg", "png")
+
+
+def _natural_key(name):
+    # Sort Test_2 before Test_10
+    return [int(tok) if tok.isdigit() else tok.lower() for tok in re.split(r"(\d+)", name)]
+
+
+def find_image_pairs(rgb_folder='RGB_Images', nir_folder='NIR_Images'):
+    """
+    Finds matching <name>_RGB.<ext> / <name>_NIR.<ext> pairs in the two folders.
+    Returns a naturally sorted list of (rgb_path, nir_path) tuples.
+    """
+    if not os.path.isdir(rgb_folder):
+        print(f"❌ RGB folder '{rgb_folder}' not found.")
+        return []
+    if not os.path.isdir(nir_folder):
+        print(f"❌ NIR folder '{nir_folder}' not found.")
+        return []
+
+    nir_files = {f.lower(): f for f in os.listdir(nir_folder)}
+
+    pairs = []
+    for file in sorted(os.listdir(rgb_folder), key=_natural_key):
+        match = RGB_PATTERN.match(file)
+        if not match:
+            continue
+        name = match.group("name")
+        for ext in IMAGE_EXTENSIONS:
+            nir_file = nir_files.get(f"{name}_nir.{ext}".lower())
+            if nir_file:
+                pairs.append((os.path.join(rgb_folder, file), os.path.join(nir_folder, nir_file)))
+                break
+        else:
+            print(f"⚠️ No NIR image found for {file}, skipping.")
+    return pairs
+
+
+def process_pair(job):
+    """
+    Worker task: decode, compute NDVI and VARI, encode both PNGs and return the stats.
+    CSV logging is left to the parent so every row is written once at the end.
+    With use_store, rasters are read from / added to the shared IndexStore.
+    """
+    rgb_path, nir_path, ndvi_folder, vari_folder, use_store = job
+    store = IndexStore(ndvi_folder, vari_folder) if use_store else None
+    _, ndvi_stats = compute_ndvi_from_images(rgb_path, nir_path, output_folder=ndvi_folder,
+                                             update_csv=False, verbose=False, index_store=store)
+    _, vari_stats = compute_vari_and_save(rgb_path, output_folder=vari_folder,
+                                          update_csv=False, verbose=False, index_store=store)
+    # Only the small stats dicts travel back to the parent process
+    return ndvi_stats, vari_stats
+
+
+def run_batch_analysis(
+        rgb_folder='RGB_Images',
+        nir_folder='NIR_Images',
+        ndvi_folder='ndvi_outputs_date',
+        vari_folder='vari_outputs_date',
+        ndvi_csv_path='ndvi_analysis_date.csv',
+        vari_csv_path='vari_analysis_date.csv',
+        workers=None,
+        chunksize=1,
+        index_path='analysis_index.db',
+        use_index_store=False
+    ):
+    """
+    Runs NDVI and VARI over every RGB/NIR pair in the input folders on a process pool.
+    All CSV rows are appended once at the end of the run, and the results are
+    added to the analysis index at index_path (pass None to skip).
+    use_index_store=True reuses and keeps the memory-mapped rasters of
+    index_store.IndexStore next to the output folders, so re-running over
+    the same images skips decoding.
+    Returns (ndvi_rows, vari_rows, pairs_per_second).
+    """
+    pairs = find_image_pairs(rgb_folder, nir_folder)
+    if not pairs:
+        print("No image pairs found.")
+        return [], [], 0.0
+
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(ndvi_folder, exist_ok=True)
+    os.makedirs(vari_folder, exist_ok=True)
+    jobs = [(rgb, nir, ndvi_folder, vari_folder, use_index_store) for rgb, nir in pairs]
+
+    start = time.perf_counter()
+    ndvi_rows, vari_rows = [], []
+    if workers == 1:
+        for ndvi_stats, vari_stats in map(process_pair, jobs):
+            ndvi_rows.append(ndvi_stats)
+            vari_rows.append(vari_stats)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for ndvi_stats, vari_stats in executor.map(process_pair, jobs, chunksize=chunksize):
+                ndvi_rows.append(ndvi_stats)
+                vari_rows.append(vari_stats)
+    elapsed = time.perf_counter() - start
+
+    # Drop pairs whose images vanished between discovery and processing
+    entries = [(ndvi, vari, rgb) for ndvi, vari, (rgb, _) in zip(ndvi_rows, vari_rows, pairs)
+               if ndvi is not None and vari is not None]
+    ndvi_rows = [ndvi for ndvi, _, _ in entries]
+    vari_rows = [vari for _, vari, _ in entries]
+
+    # === Write all results at the end ===
+    ResultsStore(ndvi_csv_path, NDVI_COLUMNS).extend(ndvi_rows)
+    ResultsStore(vari_csv_path, VARI_COLUMNS).extend(vari_rows)
+    if index_path:
+        index = AnalysisIndex(index_path)
+        index.record_many(entries)
+        index.close()
+
+    throughput = len(pairs) / elapsed if elapsed > 0 else float("inf")
+
+    # === Console Report ===
+    print(f"\n📦 Batch analysis of {len(pairs)} image pairs with {workers} worker(s)")
+    print(f"Elapsed: {elapsed:.2f} s")
+    print(f"Throughput: {throughput:.2f} pairs/s")
+    print(f"✅ NDVI results appended to: {ndvi_csv_path}")
+    print(f"✅ VARI results appended to: {vari_csv_path}")
+
+    return ndvi_rows, vari_rows, throughput
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch NDVI/VARI analysis of RGB/NIR image folders")
+    parser.add_argument("--rgb-folder", default="RGB_Images")
+    parser.add_argument("--nir-folder", default="NIR_Images")
+    parser.add_argument("--ndvi-folder", default="ndvi_outputs_date")
+    parser.add_argument("--vari-folder", default="vari_outputs_date")
+    parser.add_argument("--ndvi-csv", default="ndvi_analysis_date.csv")
+    parser.add_argument("--vari-csv", default="vari_analysis_date.csv")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes (default: all cores)")
+    parser.add_argument("--chunksize", type=int, default=1)
+    parser.add_argument("--index", default="analysis_index.db", help="Analysis index database ('' to skip)")
+    parser.add_argument("--index-store", action="store_true",
+                        help="Reuse/keep memory-mapped NDVI/VARI rasters next to the output folders")
+    args = parser.parse_args()
+
+    run_batch_analysis(args.rgb_folder, args.nir_folder, args.ndvi_folder, args.vari_folder,
+                       args.ndvi_csv, args.vari_csv, workers=args.workers, chunksize=args.chunksize,
+                       index_path=args.index or None, use_index_store=args.index_store)
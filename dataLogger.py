@@ -3,15 +3,22 @@ import customtkinter as ctk
 from tkinter import filedialog
 import serial.tools.list_ports
 import threading
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import queue
+from collections import OrderedDict, deque
+from itertools import islice
 from PIL import Image, ImageTk
-import numpy as np
-import pandas as pd
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 import time
-from Combined_Analysis_NDVI_NIR import combined_ndvi_vari_analysis
+from concurrent.futures import ThreadPoolExecutor
+from output_sink import AsyncSink
+from result_cache import ResultCache
+from telemetry import FrameDecoder
+from ring_buffer import SensorRingBuffer
+from telemetry_store import TelemetryStore
+from analysis_index import AnalysisIndex, TIME_FORMAT
+# matplotlib and the NDVI/VARI analysis modules are imported on first
+# use (History tab shown, Run Analysis clicked) to keep startup fast; see startup_profile.py
 
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("green")
@@ -25,7 +32,38 @@ ACCENT_BLUE = "#2196f3"
 TEXT_WHITE = "#ffffff"
 GRADIENT_CARD = "#2a3a31"
 
+SERIAL_QUEUE_SIZE = 1000  # Frames buffered between the reader thread and the UI
+INGEST_INTERVAL_MS = 50   # How often the UI drains the serial queue
+MAX_FRAMES_PER_DRAIN = 500
+DAEMON_URL = "socket://127.0.0.1:7878"  # telemetry_daemon.py subscription for the first node
+URL_READ_TIMEOUT = 0.05   # Network ports return whatever arrived within this window
+URL_READ_SIZE = 4096
+HISTORY_CAPACITY = 7 * 24 * 3600  # One week of samples at 1 Hz
+HISTORY_CHART_POINTS = 3600       # Samples shown in the Live history charts (downsampled per pixel)
+CHART_FRAME_MS = 100              # History chart redraws are coalesced to 10 fps
+HISTORY_PRELOAD = 3600            # Samples loaded from the telemetry store at startup
+HISTORY_RANGES = {"Live": None, "1 h": 3600, "24 h": 86400, "7 d": 7 * 86400, "30 d": 30 * 86400}
+HISTORY_QUERY_POINTS = 5000       # Max points per chart for stored time ranges (downsampled per pixel)
+HISTORY_QUERY_REFRESH_S = 10      # How often a stored time range is re-queried while shown
+HISTORY_QUERY_POLL_MS = 50        # How often the UI checks for a finished stored-range query
+TELEMETRY_FLUSH_MS = 5000         # Buffered telemetry is committed this often, on the telemetry thread
+RAW_LINES_MAX = 2000              # Lines kept for the Raw Data tab (older ones are trimmed)
+RAW_REFRESH_MS = 250              # Raw Data tab updates are coalesced to this interval
+HISTORY_TAB = " 📈 History "
+RAW_TAB = " 📋 Raw Data "
+ANALYSIS_TREND_DAYS = 90          # Span of the field NDVI trend shown with analysis results
+THRESHOLD_REFRESH_MS = 30         # Threshold slider moves are coalesced to this interval
+THRESHOLD_STEPS = 200             # Slider resolution over 0–1 (0.005, so the defaults sit on a step)
+BG_RESIZE_DEBOUNCE_MS = 150       # High-quality background resize once the geometry settles
+BG_CACHE_SIZE = 4                 # Recently used background sizes kept as ready PhotoImages
+BG_PREVIEW_MAX_SIDE = 640         # Source size used for the fast preview during live resize
+
 class AnimatedCircularGauge(tk.Canvas):
+    # Canvas items are created once; redraw() only updates the arc extent and value text,
+    # and animation ticks are scheduled only while the value is moving.
+    ANIMATION_INTERVAL_MS = 16
+    RING_WIDTH = 15
+
     def __init__(self, parent, size=200, min_value=0, max_value=100, label="", unit="", **kwargs):
         super().__init__(parent, width=size, height=size, bg=DARK_BG, highlightthickness=0, **kwargs)
         self.size = size
@@ -36,51 +74,44 @@ class AnimatedCircularGauge(tk.Canvas):
         self.value = min_value
         self.target_value = min_value
         self.animation_speed = 0.1
+        self._animation_id = None
+        self._value_text = None
         # Colors
         self.bg_color = DARK_CARD
-        self.fg_color = ACCENT_GREEN
+        self._fg_color = ACCENT_GREEN
         self.text_color = TEXT_WHITE
 
-        self.after(10, self.animate_value)
-
-    def set_value(self, value):
-        self.target_value = max(self.min_value, min(self.max_value, value))
-
-    def animate_value(self):
-        if abs(self.value - self.target_value) > 0.1:
-            self.value += (self.target_value - self.value) * self.animation_speed
-            self.redraw()
-        elif self.value != self.target_value:
-            self.value = self.target_value
-            self.redraw()
+        self.create_items()
+        self.redraw()
 
-        self.after(16, self.animate_value)
+    @property
+    def fg_color(self):
+        return self._fg_color
 
-    def redraw(self):
-        self.delete("all")
+    @fg_color.setter
+    def fg_color(self, color):
+        self._fg_color = color
+        self.itemconfigure(self.arc_item, outline=color)
 
+    def create_items(self):
         center_x = self.size // 2
         center_y = self.size // 2
         radius = min(center_x, center_y) - 15
+        # Single thick arc centred on the band the old 15 stacked 1-px arcs covered
+        inset = (self.RING_WIDTH - 1) / 2
 
         self.create_oval(center_x - radius, center_y - radius,
                          center_x + radius, center_y + radius,
                          outline='#2a3a31', width=15, fill=self.bg_color)
 
-        start_angle = 90
-        extent = -270 * (self.value - self.min_value) / (self.max_value - self.min_value)
-
-        for i in range(15):
-            offset = i
-            self.create_arc(center_x - radius + offset, center_y - radius + offset,
-                            center_x + radius - offset, center_y + radius - offset,
-                            start=start_angle, extent=extent,
-                            outline=self.fg_color, width=1, style="arc")
+        self.arc_item = self.create_arc(center_x - radius + inset, center_y - radius + inset,
+                                        center_x + radius - inset, center_y + radius - inset,
+                                        start=90, extent=0,
+                                        outline=self._fg_color, width=self.RING_WIDTH, style="arc")
 
-        value_text = f"{int(self.value) if self.value.is_integer() else round(self.value, 1)}"
-        self.create_text(center_x, center_y - 15,
-                         text=value_text, fill=self.text_color,
-                         font=('Arial', 24, 'bold'))
+        self.value_item = self.create_text(center_x, center_y - 15,
+                                           text="", fill=self.text_color,
+                                           font=('Arial', 24, 'bold'))
 
         self.create_text(center_x, center_y + 15,
                          text=self.unit, fill=self.text_color,
@@ -90,6 +121,38 @@ class AnimatedCircularGauge(tk.Canvas):
                          text=self.label, fill=self.text_color,
                          font=('Arial', 12, 'bold'))
 
+    def set_value(self, value):
+        self.target_value = max(self.min_value, min(self.max_value, value))
+        if self._animation_id is None and self.value != self.target_value:
+            self._animation_id = self.after(self.ANIMATION_INTERVAL_MS, self.animate_value)
+
+    def animate_value(self):
+        self._animation_id = None
+        if abs(self.value - self.target_value) > 0.1:
+            self.value += (self.target_value - self.value) * self.animation_speed
+            self.redraw()
+            self._animation_id = self.after(self.ANIMATION_INTERVAL_MS, self.animate_value)
+        elif self.value != self.target_value:
+            self.value = self.target_value
+            self.redraw()
+        # Settled: no further ticks until the next set_value()
+
+    def redraw(self):
+        extent = -270 * (self.value - self.min_value) / (self.max_value - self.min_value)
+        self.itemconfigure(self.arc_item, extent=extent)
+
+        value = float(self.value)
+        value_text = f"{int(value) if value.is_integer() else round(value, 1)}"
+        if value_text != self._value_text:
+            self._value_text = value_text
+            self.itemconfigure(self.value_item, text=value_text)
+
+    def destroy(self):
+        if self._animation_id is not None:
+            self.after_cancel(self._animation_id)
+            self._animation_id = None
+        super().destroy()
+
 
 class VegetationAnalysisGUI(ctk.CTk):
     def __init__(self):
@@ -105,6 +168,14 @@ class VegetationAnalysisGUI(ctk.CTk):
         self.serial_connection = None
         self.serial_thread = None
         self.running = True
+        self.serial_queue = queue.Queue(maxsize=SERIAL_QUEUE_SIZE)
+        self.frames_received = 0
+        self.frames_dropped = 0    # Oldest frames discarded because the UI fell behind
+        self.frame_decoder = FrameDecoder()  # Replaced per connection; holds malformed/lost counters
+        self.raw_lines = deque(maxlen=RAW_LINES_MAX)  # (timestamp, line) backing the Raw Data tab
+        self.raw_pending = 0       # Lines received since the tab was last refreshed
+        self.raw_rebuild = True    # Redraw the whole tab (filter changed, or more new lines than fit)
+        self.raw_shown = 0         # Lines currently in the textbox
         self.sensor_data = {
             "temperature": 0.0,
             "humidity": 0.0,
@@ -116,14 +187,46 @@ class VegetationAnalysisGUI(ctk.CTk):
             "weather": "unknown",
             "motor": "OFF"
         }
-        self.sensor_history = pd.DataFrame(columns=["timestamp", "temperature", "humidity",
-                                                    "moisture", "light"])
+        self.sensor_history = SensorRingBuffer(capacity=HISTORY_CAPACITY)
+        self.history_range = "Live"
+        self.history_queried_at = 0.0
+        # Persistent telemetry: survives restarts and backs the long time ranges.
+        # Commits and range queries run on the telemetry thread, never inside add()
+        self.telemetry_store = TelemetryStore(batch_size=float("inf"), flush_interval=float("inf"))
+        self.telemetry_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="telemetry")
+        self.history_query = None  # Future of the stored-range query in flight
+        try:
+            timestamps, values = self.telemetry_store.latest(HISTORY_PRELOAD)
+            for i, timestamp in enumerate(timestamps):
+                self.sensor_history.append(timestamp, **{k: v[i] for k, v in values.items()})
+        except Exception as e:
+            print(f"Error loading stored telemetry: {e}")
         self.analysis_canvas = None
+        self.analysis_toolbar = None
+        self.analysis_figure = None
+        self.analysis_results = None
+        self.threshold_frame = None
+        self.threshold_job = None
         self.go_back_button = None
         self.inference_frame = None
         self.analysis_container = None
         self.buttons_frame = None
         self.background_label = None  # For background image
+        self.bg_image_path = None
+        self.bg_source = None           # Decoded background, loaded once
+        self.bg_preview_source = None   # Small copy used for fast previews while resizing
+        self.bg_cache = OrderedDict()   # (width, height) -> PhotoImage, LRU
+        self.bg_size = None
+        self.bg_resize_job = None
+        self.output_sink = AsyncSink()  # PNG/CSV writes of Run Analysis happen off the UI thread
+        self.result_cache = ResultCache()  # Repeat analyses of unchanged image pairs are served from here
+        self.analysis_index = AnalysisIndex()  # Indexed NDVI/VARI history: lookups and field trends
+        self.index_store = None  # Memory-mapped NDVI/VARI rasters, opened on the first Run Analysis
+        self.analysis_job = 0  # Incremented per Run Analysis so stale worker results are ignored
+        self.analysis_cancel = None
+        self.analysis_queue = None
+        self.analysis_progress = None
+        self.cancel_button = None
 
         self.configure(fg_color=DARK_BG)
         self.setup_ui()
@@ -134,21 +237,64 @@ class VegetationAnalysisGUI(ctk.CTk):
         self.bind("<Configure>", self.resize_background)  # Resize background on window resize
 
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.after(INGEST_INTERVAL_MS, self.drain_serial_queue)
+
+    def load_background_source(self):
+        if self.bg_source is None:
+            self.bg_source = Image.open(self.bg_image_path)
+            self.bg_source.load()
+            self.bg_preview_source = self.bg_source.copy()
+            self.bg_preview_source.thumbnail((BG_PREVIEW_MAX_SIDE, BG_PREVIEW_MAX_SIDE))
+        return self.bg_source
+
+    def set_background_image(self, size, photo):
+        self.bg_image = photo
+        self.bg_size = size
+        self.background_label.configure(image=self.bg_image)
 
     def resize_background(self, event=None):
-        if self.background_label and os.path.exists(self.bg_image_path):
-            # Get current window size
-            win_width = self.winfo_width()
-            win_height = self.winfo_height()
+        # <Configure> also fires for every child widget; only the window itself matters
+        if event is not None and event.widget is not self:
+            return
+        if not self.background_label or not self.bg_image_path or not os.path.exists(self.bg_image_path):
+            return
 
-            # Load and resize image
-            try:
-                image = Image.open(self.bg_image_path)
-                image = image.resize((win_width, win_height), Image.Resampling.LANCZOS)
-                self.bg_image = ImageTk.PhotoImage(image)
-                self.background_label.configure(image=self.bg_image)
-            except Exception as e:
-                print(f"Error loading background image: {e}")
+        size = (self.winfo_width(), self.winfo_height())
+        if size == self.bg_size or size[0] < 2 or size[1] < 2:
+            return
+
+        try:
+            self.load_background_source()
+        except Exception as e:
+            print(f"Error loading background image: {e}")
+            return
+
+        # Recently used size (e.g. toggling zoom with Escape): instant
+        if size in self.bg_cache:
+            self.bg_cache.move_to_end(size)
+            self.set_background_image(size, self.bg_cache[size])
+            return
+
+        # Live resize: cheap preview now, LANCZOS once the geometry stops changing
+        preview = self.bg_preview_source.resize(size, Image.Resampling.BILINEAR)
+        self.set_background_image(size, ImageTk.PhotoImage(preview))
+        if self.bg_resize_job is not None:
+            self.after_cancel(self.bg_resize_job)
+        self.bg_resize_job = self.after(BG_RESIZE_DEBOUNCE_MS, self.finish_background_resize)
+
+    def finish_background_resize(self):
+        self.bg_resize_job = None
+        size = (self.winfo_width(), self.winfo_height())
+        try:
+            image = self.load_background_source().resize(size, Image.Resampling.LANCZOS)
+        except Exception as e:
+            print(f"Error loading background image: {e}")
+            return
+        photo = ImageTk.PhotoImage(image)
+        self.bg_cache[size] = photo
+        while len(self.bg_cache) > BG_CACHE_SIZE:
+            self.bg_cache.popitem(last=False)
+        self.set_background_image(size, photo)
 
     def toggle_zoomed(self, event=None):
         if self.state() == 'zoomed':
@@ -229,6 +375,10 @@ class VegetationAnalysisGUI(ctk.CTk):
         self.status_label = ctk.CTkLabel(serial_frame, text="Status: Disconnected", text_color=ACCENT_RED)
         self.status_label.pack(pady=3)
 
+        self.frame_stats_label = ctk.CTkLabel(serial_frame, text="Frames: 0 | Dropped: 0 | Lost: 0 | Malformed: 0",
+                                              font=("Arial", 11))
+        self.frame_stats_label.pack(pady=(0, 3))
+
     def create_sensor_display(self):
         sensor_frame = ctk.CTkFrame(self.left_frame, fg_color=DARK_BG)
         sensor_frame.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
@@ -237,18 +387,35 @@ class VegetationAnalysisGUI(ctk.CTk):
         tabview = ctk.CTkTabview(sensor_frame, fg_color=DARK_CARD, segmented_button_fg_color=DARK_BG,
                                  segmented_button_selected_color="#2c4f2b",
                                  segmented_button_selected_hover_color="#405e3f",
-                                 segmented_button_unselected_hover_color="#405e3f")
+                                 segmented_button_unselected_hover_color="#405e3f",
+                                 command=self.on_sensor_tab_changed)
         tabview.grid(row=0, column=0, padx=0, pady=0, sticky="nsew")
+        self.sensor_tabview = tabview
 
         current_tab = tabview.add("🌡️Dashboard")
         self.create_dashboard_tab(current_tab)
 
-        history_tab = tabview.add(" 📈 History ")
-        self.create_history_charts_tab(history_tab)
+        # Built on first view (imports matplotlib)
+        self.history_tab = tabview.add(HISTORY_TAB)
+        self.history_charts = None
+        self.history_render_job = None  # Chart timer; only runs while the History tab is shown
 
-        raw_tab = tabview.add(" 📋 Raw Data ")
+        raw_tab = tabview.add(RAW_TAB)
         self.create_raw_data_tab(raw_tab)
 
+    def on_sensor_tab_changed(self):
+        tab = self.sensor_tabview.get()
+        if tab == HISTORY_TAB:
+            if self.history_charts is None:
+                self.create_history_charts_tab(self.history_tab)
+            else:
+                self.history_charts.invalidate()  # Blit background may be stale after being hidden
+                self.history_queried_at = 0.0  # Catch up on data that arrived while hidden
+                self.update_history_charts()
+                self.schedule_history_render()
+        elif tab == RAW_TAB:
+            self.refresh_raw_data(reschedule=False)
+
     def create_dashboard_tab(self, parent):
         dashboard_frame = ctk.CTkFrame(parent, fg_color=DARK_CARD)
         dashboard_frame.pack(fill="both", expand=True, padx=5, pady=10)
@@ -319,11 +486,25 @@ class VegetationAnalysisGUI(ctk.CTk):
         self.light_gauge.fg_color = ACCENT_YELLOW
 
     def create_history_charts_tab(self, parent):
+        import matplotlib.style
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from history_charts import HistoryCharts
+
+        self.history_range_selector = ctk.CTkSegmentedButton(
+            parent,
+            values=list(HISTORY_RANGES),
+            command=self.set_history_range
+        )
+        self.history_range_selector.set(self.history_range)
+        self.history_range_selector.pack(pady=(5, 0))
+
         chart_frame = ctk.CTkFrame(parent, fg_color="#000000")
         chart_frame.pack(fill="both", expand=True, padx=10, pady=5)
 
-        plt.style.use('dark_background')
-        self.fig, self.axs = plt.subplots(2, 2, figsize=(8, 6), facecolor=DARK_BG)
+        matplotlib.style.use('dark_background')
+        self.fig = Figure(figsize=(8, 6), facecolor=DARK_BG)
+        self.axs = self.fig.subplots(2, 2)
         self.fig.tight_layout(pad=3.0)
 
         for ax in self.axs.flatten():
@@ -333,9 +514,26 @@ class VegetationAnalysisGUI(ctk.CTk):
         self.canvas = FigureCanvasTkAgg(self.fig, master=chart_frame)
         self.canvas.get_tk_widget().pack(fill="both", expand=True)
 
+        self.history_charts = HistoryCharts(self.fig, self.axs.flatten(), self.canvas, [
+            ("temperature", "Temperature (°C)", ACCENT_BLUE),
+            ("humidity", "Humidity (%)", "#00bcd4"),
+            ("moisture", "Soil Moisture (%)", ACCENT_GREEN),
+            ("light", "Light Level (%)", ACCENT_YELLOW),
+        ], text_color=TEXT_WHITE)
+        self.fig.tight_layout(pad=3.0)
+
         self.update_history_charts()
+        self.schedule_history_render()
 
     def create_raw_data_tab(self, parent):
+        controls = ctk.CTkFrame(parent, fg_color="transparent")
+        controls.pack(fill="x", padx=5, pady=(5, 0))
+        self.raw_pause_switch = ctk.CTkSwitch(controls, text="Pause", command=self.on_raw_filter_changed)
+        self.raw_pause_switch.pack(side="left", padx=5)
+        self.raw_filter_entry = ctk.CTkEntry(controls, placeholder_text="Filter...")
+        self.raw_filter_entry.pack(side="left", fill="x", expand=True, padx=5)
+        self.raw_filter_entry.bind("<KeyRelease>", self.on_raw_filter_changed)
+
         self.raw_data_text = ctk.CTkTextbox(
             parent,
             wrap="word",
@@ -345,6 +543,45 @@ class VegetationAnalysisGUI(ctk.CTk):
         )
         self.raw_data_text.pack(fill="both", expand=True, padx=5, pady=10)
         self.raw_data_text.insert("0.0", "Waiting for data...\n")
+        self.after(RAW_REFRESH_MS, self.refresh_raw_data)
+
+    def on_raw_filter_changed(self, event=None):
+        self.raw_rebuild = True
+        self.refresh_raw_data(reschedule=False)
+
+    def refresh_raw_data(self, reschedule=True):
+        # Coalesced, bounded view of self.raw_lines; does nothing while hidden or paused
+        try:
+            if (self.sensor_tabview.get() == RAW_TAB and not self.raw_pause_switch.get()
+                    and (self.raw_pending or self.raw_rebuild)):
+                self.update_raw_text()
+        except Exception as e:
+            print(f"Error updating raw data: {e}")
+        if reschedule and self.running:
+            self.after(RAW_REFRESH_MS, self.refresh_raw_data)
+
+    def update_raw_text(self):
+        text = self.raw_data_text
+        needle = self.raw_filter_entry.get().strip().lower()
+        if self.raw_rebuild or self.raw_pending >= len(self.raw_lines):
+            lines = self.raw_lines
+            text.delete("1.0", "end")
+            self.raw_shown = 0
+        else:
+            lines = islice(self.raw_lines, len(self.raw_lines) - self.raw_pending, None)
+        self.raw_rebuild = False
+        self.raw_pending = 0
+
+        shown = [f"{timestamp.strftime('%H:%M:%S')} - {line}\n" for timestamp, line in lines
+                 if not needle or needle in line.lower()]
+        if shown:
+            text.insert("end", "".join(shown))
+            self.raw_shown += len(shown)
+        if self.raw_shown > RAW_LINES_MAX:
+            excess = self.raw_shown - RAW_LINES_MAX
+            text.delete("1.0", f"{excess + 1}.0")
+            self.raw_shown = RAW_LINES_MAX
+        text.see("end")
 
     def browse_rgb(self):
         file_path = filedialog.askopenfilename(filetypes=[("Image files", "*.jpg *.jpeg *.png")])
@@ -414,17 +651,14 @@ class VegetationAnalysisGUI(ctk.CTk):
         )
         self.plot_label.pack(fill="both", expand=True, padx=10, pady=10)
 
-    def load_inference_data(self, rgb_path):
-        # Load inference data from ndvi_analysis_date.csv
-        csv_path = r"S:\RVCE\4th_sem\MCP\PBL\Display\ndvi_analysis_date.csv"
+    def load_inference_data(self, rgb_path, stats=None):
+        # Use the stats handed back by the analysis; fall back to the analysis index (exact image match)
         base_name = os.path.splitext(os.path.basename(rgb_path))[0]
 
         try:
-            df = pd.read_csv(csv_path)
-            # Find the row matching the RGB image
-            row = df[df['RGB Image'].str.contains(base_name, case=False, na=False)]
-            if not row.empty:
-                stats = row.iloc[-1]
+            if stats is None:
+                stats = self.analysis_index.lookup(rgb_path)
+            if stats is not None:
                 # Prepare inference data as a list of tuples: (label, value, color)
                 inference_data = [
                     ("📅 DateTime", stats['DateTime'], TEXT_WHITE),
@@ -486,6 +720,10 @@ class VegetationAnalysisGUI(ctk.CTk):
         if self.analysis_canvas:
             self.analysis_canvas.get_tk_widget().destroy()
             self.analysis_canvas = None
+        if self.analysis_toolbar:
+            self.analysis_toolbar.destroy()
+            self.analysis_toolbar = None
+        self.clear_threshold_controls()
         if self.go_back_button:
             self.go_back_button.destroy()
             self.go_back_button = None
@@ -539,95 +777,330 @@ class VegetationAnalysisGUI(ctk.CTk):
         self.inference_frame.grid_columnconfigure(0, weight=1)
         self.inference_frame.grid_rowconfigure(2, weight=1)
 
-        # Run analysis
+        # Progress indicator and cancel button while the worker runs
+        self.plot_label.pack_forget()  # Hide placeholder
+        self.plot_label = ctk.CTkLabel(self.plot_frame, text="Starting analysis...",
+                                       fg_color=DARK_CARD, corner_radius=10)
+        self.plot_label.pack(fill="x", padx=10, pady=(10, 5))
+        self.analysis_progress = ctk.CTkProgressBar(self.plot_frame, progress_color=ACCENT_GREEN)
+        self.analysis_progress.set(0)
+        self.analysis_progress.pack(fill="x", padx=10, pady=5)
+        self.cancel_button = ctk.CTkButton(self.plot_frame, text="Cancel", command=self.cancel_analysis,
+                                           fg_color=ACCENT_RED, hover_color="#b71c1c", width=100)
+        self.cancel_button.pack(pady=5)
+
+        # Run analysis in a background worker; results come back through the queue
+        import matplotlib.style
+        matplotlib.style.use('dark_background')
+        self.open_index_store()
+        self.analysis_job += 1
+        self.analysis_cancel = threading.Event()
+        self.analysis_queue = queue.Queue()
+        self.analyze_button.configure(state="disabled")
+        worker = threading.Thread(
+            target=self.analysis_worker,
+            args=(self.analysis_job, rgb_path, nir_path, self.analysis_queue, self.analysis_cancel),
+            daemon=True
+        )
+        worker.start()
+        self.after(50, self.poll_analysis, self.analysis_job, rgb_path)
+
+    def open_index_store(self):
+        # First Run Analysis creates the .index_store folders and compacts them in the background
+        if self.index_store is None:
+            from index_store import IndexStore
+            self.index_store = IndexStore()
+            threading.Thread(target=self.index_store.compact, daemon=True).start()
+        return self.index_store
+
+    def analysis_worker(self, job, rgb_path, nir_path, result_queue, cancel_event):
+        # Runs off the Tk thread: only talks to the UI through result_queue
+        def report(fraction, message):
+            result_queue.put(("progress", fraction, message))
+
         try:
-            # Call combined analysis function
-            plt.style.use('dark_background')
-            fig = combined_ndvi_vari_analysis(rgb_path, nir_path)
-            if fig is None:
-                self.plot_label.configure(text="Analysis failed: Check console for details")
-                self.restore_dashboard()
-                return
+            # First Run Analysis pays for these imports, in the worker rather than at startup
+            from Combined_Analysis_NDVI_NIR import combined_ndvi_vari_analysis, AnalysisCancelled
+        except Exception as e:
+            result_queue.put(("error", e, None))
+            return
 
-            # Embed the plot in the GUI
-            self.analysis_canvas = FigureCanvasTkAgg(fig, master=self.plot_frame)
-            self.analysis_canvas.get_tk_widget().pack(fill="both", expand=True)
-            self.plot_label.pack_forget()  # Hide placeholder
-            self.analysis_canvas.draw()
+        try:
+            fig, results = combined_ndvi_vari_analysis(rgb_path, nir_path, sink=self.output_sink,
+                                                       cache=self.result_cache, progress=report,
+                                                       cancel_event=cancel_event, index_store=self.index_store)
+            if fig is not None:
+                results = dict(results, trend=self.index_analysis(rgb_path, results))
+            result_queue.put(("done", fig, results))
+        except AnalysisCancelled:
+            result_queue.put(("cancelled", None, None))
+        except Exception as e:
+            result_queue.put(("error", e, None))
 
-            # Display inference
-            inference_data, interpretation = self.load_inference_data(rgb_path)
+    def index_analysis(self, rgb_path, results):
+        # Worker thread: record the result, then read back its field's NDVI trend for the chart
+        try:
+            self.analysis_index.record(results["ndvi_stats"], results["vari_stats"], rgb_path)
+            entry = self.analysis_index.lookup(rgb_path)
+            # The days leading up to this image's capture (old images keep a meaningful trend)
+            end = datetime.strptime(entry["Captured"], TIME_FORMAT)
+            start = end - timedelta(days=ANALYSIS_TREND_DAYS)
+            return entry["Field"], self.analysis_index.trend(entry["Field"], start=start, end=end)
+        except Exception as e:
+            print(f"Error updating analysis index: {e}")
+            return None
 
-            # Inference title
-            ctk.CTkLabel(
-                self.inference_frame,
-                text="🌿 Vegetation Insights",
-                font=("Arial", 18, "bold"),
-                text_color=ACCENT_GREEN
-            ).grid(row=0, column=0, padx=10, pady=(10, 5), sticky="w")
-
-            # Statistics section
-            stats_frame = ctk.CTkFrame(self.inference_frame, fg_color=GRADIENT_CARD,
-                                       corner_radius=8, border_width=1, border_color=ACCENT_YELLOW)
-            stats_frame.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
-            stats_frame.grid_columnconfigure((0, 1), weight=1)
+    def cancel_analysis(self):
+        if self.analysis_cancel is not None:
+            self.analysis_cancel.set()
+            if self.plot_label.winfo_exists():
+                self.plot_label.configure(text="Cancelling...")
 
-            ctk.CTkLabel(
-                stats_frame,
-                text="📊 Statistics",
-                font=("Arial", 14, "bold"),
-                text_color=ACCENT_YELLOW
-            ).grid(row=0, column=0, columnspan=2, padx=5, pady=5, sticky="w")
-
-            for i, (label, value, color) in enumerate(inference_data, start=1):
-                ctk.CTkLabel(
-                    stats_frame,
-                    text=label,
-                    font=("Arial", 12, "bold"),
-                    text_color=TEXT_WHITE,
-                    anchor="w"
-                ).grid(row=i, column=0, padx=(5, 2), pady=2, sticky="w")
-                ctk.CTkLabel(
-                    stats_frame,
-                    text=value,
-                    font=("Arial", 12),
-                    text_color=color,
-                    anchor="w"
-                ).grid(row=i, column=1, padx=(2, 5), pady=2, sticky="w")
-
-            # Interpretation section
-            interp_frame = ctk.CTkFrame(self.inference_frame, fg_color=GRADIENT_CARD,
-                                        corner_radius=8, border_width=1, border_color=ACCENT_YELLOW)
-            interp_frame.grid(row=2, column=0, padx=10, pady=5, sticky="nsew")
-            interp_frame.grid_columnconfigure(0, weight=1)
+    def poll_analysis(self, job, rgb_path):
+        if job != self.analysis_job:
+            return  # A newer analysis replaced this one
 
-            ctk.CTkLabel(
-                interp_frame,
-                text="🔍 Interpretation",
-                font=("Arial", 14, "bold"),
-                text_color=ACCENT_YELLOW
-            ).grid(row=0, column=0, padx=5, pady=5, sticky="w")
-
-            for i, (text, color) in enumerate(interpretation, start=1):
-                ctk.CTkLabel(
-                    interp_frame,
-                    text=text,
-                    font=("Arial", 12),
-                    text_color=color,
-                    anchor="w",
-                    wraplength=350
-                ).grid(row=i, column=0, padx=5, pady=2, sticky="w")
+        try:
+            while True:
+                kind, first, second = self.analysis_queue.get_nowait()
+                if kind == "progress":
+                    if self.analysis_progress is not None:
+                        self.analysis_progress.set(first)
+                        self.plot_label.configure(text=f"{second}...")
+                    continue
+                self.finish_analysis(kind, first, second, rgb_path)
+                return
+        except queue.Empty:
+            pass
+        self.after(50, self.poll_analysis, job, rgb_path)
+
+    def finish_analysis(self, kind, first, second, rgb_path):
+        self.analysis_cancel = None
+        self.analyze_button.configure(state="normal")
+        if self.analysis_progress is not None:
+            self.analysis_progress.destroy()
+            self.analysis_progress = None
+            self.cancel_button.destroy()
+            self.cancel_button = None
+
+        if kind == "cancelled":
+            self.restore_dashboard()
+            self.plot_label.configure(text="Analysis cancelled")
+            return
+        if kind == "error":
+            print(f"Analysis error: {str(first)}")
+            self.restore_dashboard()
+            self.plot_label.configure(text=f"Error: {str(first)}")
+            return
 
+        fig, results = first, second
+        if fig is None:
+            self.restore_dashboard()
+            self.plot_label.configure(text="Analysis failed: Check console for details")
+            return
+
+        try:
+            self.show_analysis_results(fig, results, rgb_path)
         except Exception as e:
-            self.plot_label.configure(text=f"Error: {str(e)}")
             print(f"Analysis error: {str(e)}")
             self.restore_dashboard()
+            self.plot_label.configure(text=f"Error: {str(e)}")
+
+    def show_analysis_results(self, fig, results, rgb_path):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+        # Embed the plot in the GUI; zoom/pan in the toolbar loads finer map tiles on demand
+        self.analysis_canvas = FigureCanvasTkAgg(fig, master=self.plot_frame)
+        self.analysis_toolbar = NavigationToolbar2Tk(self.analysis_canvas, self.plot_frame, pack_toolbar=False)
+        self.analysis_toolbar.update()
+        self.analysis_toolbar.pack(side="bottom", fill="x")
+        self.create_threshold_controls(fig, results)
+        self.analysis_canvas.get_tk_widget().pack(fill="both", expand=True)
+        self.plot_label.pack_forget()  # Hide placeholder
+        self.analysis_canvas.draw()
+
+        # Display inference
+        inference_data, interpretation = self.load_inference_data(rgb_path, results["ndvi_stats"])
+
+        # Inference title
+        ctk.CTkLabel(
+            self.inference_frame,
+            text="🌿 Vegetation Insights",
+            font=("Arial", 18, "bold"),
+            text_color=ACCENT_GREEN
+        ).grid(row=0, column=0, padx=10, pady=(10, 5), sticky="w")
+
+        # Statistics section
+        stats_frame = ctk.CTkFrame(self.inference_frame, fg_color=GRADIENT_CARD,
+                                   corner_radius=8, border_width=1, border_color=ACCENT_YELLOW)
+        stats_frame.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
+        stats_frame.grid_columnconfigure((0, 1), weight=1)
+
+        ctk.CTkLabel(
+            stats_frame,
+            text="📊 Statistics",
+            font=("Arial", 14, "bold"),
+            text_color=ACCENT_YELLOW
+        ).grid(row=0, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+
+        for i, (label, value, color) in enumerate(inference_data, start=1):
+            ctk.CTkLabel(
+                stats_frame,
+                text=label,
+                font=("Arial", 12, "bold"),
+                text_color=TEXT_WHITE,
+                anchor="w"
+            ).grid(row=i, column=0, padx=(5, 2), pady=2, sticky="w")
+            ctk.CTkLabel(
+                stats_frame,
+                text=value,
+                font=("Arial", 12),
+                text_color=color,
+                anchor="w"
+            ).grid(row=i, column=1, padx=(2, 5), pady=2, sticky="w")
+
+        # Interpretation section
+        interp_frame = ctk.CTkFrame(self.inference_frame, fg_color=GRADIENT_CARD,
+                                    corner_radius=8, border_width=1, border_color=ACCENT_YELLOW)
+        interp_frame.grid(row=2, column=0, padx=10, pady=5, sticky="nsew")
+        interp_frame.grid_columnconfigure(0, weight=1)
+
+        ctk.CTkLabel(
+            interp_frame,
+            text="🔍 Interpretation",
+            font=("Arial", 14, "bold"),
+            text_color=ACCENT_YELLOW
+        ).grid(row=0, column=0, padx=5, pady=5, sticky="w")
+
+        for i, (text, color) in enumerate(interpretation, start=1):
+            ctk.CTkLabel(
+                interp_frame,
+                text=text,
+                font=("Arial", 12),
+                text_color=color,
+                anchor="w",
+                wraplength=350
+            ).grid(row=i, column=0, padx=5, pady=2, sticky="w")
+
+        if results.get("trend"):
+            self.show_trend_chart(*results["trend"])
+
+    # ========== Threshold tuning ==========
+    def create_threshold_controls(self, fig, results):
+        # Sliders re-threshold the combined map in place from the cached arrays and joint histogram
+        self.analysis_figure = fig
+        self.analysis_results = results
+        self.threshold_frame = ctk.CTkFrame(self.plot_frame, fg_color=DARK_CARD, corner_radius=8)
+        self.threshold_frame.pack(side="bottom", fill="x", padx=10, pady=(5, 0))
+        self.threshold_frame.grid_columnconfigure(1, weight=1)
+
+        self.threshold_sliders = {}
+        self.threshold_value_labels = {}
+        for row, (key, label) in enumerate((("ndvi_threshold", "NDVI ≥"), ("vari_threshold", "VARI ≥"))):
+            ctk.CTkLabel(self.threshold_frame, text=label, font=("Arial", 12, "bold"),
+                         width=60, anchor="w").grid(row=row, column=0, padx=(10, 5), pady=2, sticky="w")
+            slider = ctk.CTkSlider(self.threshold_frame, from_=0, to=1, number_of_steps=THRESHOLD_STEPS,
+                                   progress_color=ACCENT_GREEN, button_color=ACCENT_GREEN,
+                                   command=self.on_threshold_changed)
+            slider.set(results[key])
+            slider.grid(row=row, column=1, padx=5, pady=2, sticky="ew")
+            value_label = ctk.CTkLabel(self.threshold_frame, text="", width=50, anchor="e")
+            value_label.grid(row=row, column=2, padx=5, pady=2)
+            self.threshold_sliders[key] = slider
+            self.threshold_value_labels[key] = value_label
+
+        ctk.CTkButton(self.threshold_frame, text="Reset", width=70, fg_color=ACCENT_BLUE, hover_color="#1976d2",
+                      command=self.reset_thresholds).grid(row=0, column=3, rowspan=2, padx=(5, 10), pady=2)
+        self.combined_share_label = ctk.CTkLabel(self.threshold_frame, text="", font=("Arial", 12),
+                                                 text_color=ACCENT_YELLOW, anchor="w")
+        self.combined_share_label.grid(row=2, column=0, columnspan=4, padx=10, pady=(0, 5), sticky="w")
+        # A cached figure may have been tuned earlier; start from this run's thresholds
+        self.apply_analysis_thresholds(redraw=False)
+
+    def on_threshold_changed(self, value=None):
+        if self.threshold_job is None:
+            self.threshold_job = self.after(THRESHOLD_REFRESH_MS, self.apply_analysis_thresholds)
+
+    def reset_thresholds(self):
+        for key, slider in self.threshold_sliders.items():
+            slider.set(self.analysis_results[key])
+        self.on_threshold_changed()
+
+    def apply_analysis_thresholds(self, redraw=True):
+        from Combined_Analysis_NDVI_NIR import apply_thresholds, COMBINED_CLASS_NAMES
+
+        self.threshold_job = None
+        if self.analysis_figure is None:
+            return
+        ndvi_threshold = self.threshold_sliders["ndvi_threshold"].get()
+        vari_threshold = self.threshold_sliders["vari_threshold"].get()
+        for key, value in (("ndvi_threshold", ndvi_threshold), ("vari_threshold", vari_threshold)):
+            self.threshold_value_labels[key].configure(text=f"{value:.3f}")
+        shares = apply_thresholds(self.analysis_figure, self.analysis_results, ndvi_threshold, vari_threshold)
+        self.combined_share_label.configure(
+            text="   ".join(f"{name}: {share:.1f}%" for name, share in zip(COMBINED_CLASS_NAMES, shares)))
+        if redraw and self.analysis_canvas is not None:
+            self.analysis_canvas.draw_idle()
+
+    def clear_threshold_controls(self):
+        if self.threshold_job is not None:
+            self.after_cancel(self.threshold_job)
+            self.threshold_job = None
+        if self.threshold_frame:
+            self.threshold_frame.destroy()
+            self.threshold_frame = None
+        self.analysis_figure = None
+        self.analysis_results = None
+
+    def show_trend_chart(self, field, trend):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        trend_frame = ctk.CTkFrame(self.inference_frame, fg_color=GRADIENT_CARD,
+                                   corner_radius=8, border_width=1, border_color=ACCENT_YELLOW)
+        trend_frame.grid(row=3, column=0, padx=10, pady=5, sticky="nsew")
+
+        ctk.CTkLabel(
+            trend_frame,
+            text=f"📈 NDVI Trend – {field} ({ANALYSIS_TREND_DAYS} days to capture)",
+            font=("Arial", 14, "bold"),
+            text_color=ACCENT_YELLOW
+        ).pack(anchor="w", padx=5, pady=5)
+
+        fig = Figure(figsize=(4, 2), dpi=100, facecolor=GRADIENT_CARD)
+        ax = fig.add_subplot(111, facecolor=DARK_BG)
+        days = [day for day, _, _ in trend]
+        means = [mean for _, mean, _ in trend]
+        ax.plot(days, means, color=ACCENT_GREEN, marker="o", linewidth=2)
+        ax.axhline(0.6, color=ACCENT_GREEN, linestyle=":", linewidth=1)
+        ax.axhline(0.3, color=ACCENT_YELLOW, linestyle=":", linewidth=1)
+        ax.set_ylabel("Mean NDVI", color=TEXT_WHITE)
+        ax.tick_params(colors=TEXT_WHITE, labelsize=8)
+        fig.autofmt_xdate()
+        fig.tight_layout()
+
+        canvas = FigureCanvasTkAgg(fig, master=trend_frame)
+        canvas.get_tk_widget().pack(fill="both", expand=True, padx=5, pady=(0, 5))
+        canvas.draw()
 
     def restore_dashboard(self):
+        # Stop a running analysis; its late result is dropped by poll_analysis
+        if self.analysis_cancel is not None:
+            self.analysis_cancel.set()
+            self.analysis_cancel = None
+            self.analysis_job += 1
+            self.analyze_button.configure(state="normal")
+        self.analysis_progress = None
+        self.cancel_button = None
+
         # Clear existing plot, buttons, and inference
         if self.analysis_canvas:
             self.analysis_canvas.get_tk_widget().destroy()
             self.analysis_canvas = None
+        if self.analysis_toolbar:
+            self.analysis_toolbar.destroy()
+            self.analysis_toolbar = None
+        self.clear_threshold_controls()
         if self.go_back_button:
             self.go_back_button.destroy()
             self.go_back_button = None
@@ -663,7 +1136,7 @@ class VegetationAnalysisGUI(ctk.CTk):
 
     def get_serial_ports(self):
         ports = serial.tools.list_ports.comports()
-        return [port.device for port in ports]
+        return [port.device for port in ports] + [DAEMON_URL]
 
     def toggle_serial_connection(self):
         if self.serial_connection and self.serial_connection.is_open:
@@ -678,10 +1151,11 @@ class VegetationAnalysisGUI(ctk.CTk):
             return
 
         try:
-            self.serial_connection = serial.Serial(
-                port=port,
+            # Plain device paths and pyserial URLs (socket:// for the telemetry daemon)
+            self.serial_connection = serial.serial_for_url(
+                port,
                 baudrate=115200,
-                timeout=1
+                timeout=URL_READ_TIMEOUT if "://" in port else 1
             )
             self.status_label.configure(text=f"Status: Connected to {port}", text_color=ACCENT_GREEN)
             self.connect_button.configure(text="Disconnect", fg_color=ACCENT_RED, hover_color="#b71c1c")
@@ -700,59 +1174,96 @@ class VegetationAnalysisGUI(ctk.CTk):
         self.connect_button.configure(text="Connect", fg_color=ACCENT_GREEN, hover_color="#3d8b40")
 
     def read_serial_data(self):
-        while self.running and self.serial_connection and self.serial_connection.is_open:
+        # Reader thread: decode and parse, then hand frames to the UI through the queue.
+        # Never touches Tk widgets. read() returns whatever has arrived (blocking up to the
+        # port timeout for the first byte); FrameDecoder handles ASCII and binary frames.
+        connection = self.serial_connection
+        decoder = self.frame_decoder = FrameDecoder()
+        # URL ports report in_waiting as 0/1 only, so read fixed chunks bounded by their short timeout
+        is_url = "://" in (connection.portstr or "")
+        while self.running and connection and connection.is_open:
             try:
-                line = self.serial_connection.readline().decode('utf-8').strip()
-                if line:
-                    self.process_serial_data(line)
-            except (serial.SerialException, UnicodeDecodeError):
-                break
-            time.sleep(0.1)
+                raw = connection.read(URL_READ_SIZE if is_url else (connection.in_waiting or 1))
+            except (serial.SerialException, TypeError, AttributeError, OSError):
+                break  # Port closed or unplugged
+            if not raw:
+                continue
 
-    def process_serial_data(self, data):
-        self.raw_data_text.insert("end", f"{datetime.now().strftime('%H:%M:%S')} - {data}\n")
-        self.raw_data_text.see("end")
+            timestamp = datetime.now()
+            for line, updates in decoder.feed(raw):
+                # Malformed lines come with updates=None and are still shown in the raw data tab
+                self.enqueue_frame((timestamp, line, updates))
 
+    def enqueue_frame(self, frame):
+        # Bounded queue: when the UI falls behind, drop the oldest frame to keep data fresh
+        while True:
+            try:
+                self.serial_queue.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self.serial_queue.get_nowait()
+                    self.frames_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def drain_serial_queue(self):
+        # UI-side consumer: apply everything that arrived since the last tick in one batch
+        frames = []
         try:
-            parts = [p.strip() for p in data.split(';') if p.strip()]
-            for part in parts:
-                if '=' in part:
-                    key, value = part.split('=', 1)
-                    key = key.strip().lower()
-
-                    if key in self.sensor_data:
-                        if key in ["temperature", "humidity", "moisture", "light"]:
-                            self.sensor_data[key] = float(value) if '.' in value else int(value)
-                        elif key in ["temp_status", "moisture_status", "light_status"]:
-                            self.sensor_data[key] = "✅" if int(value) == 1 else "❌"
-                        elif key == "motor":
-                            self.sensor_data[key] = value
-                        elif key == "weather":
-                            weather_value = value
-                            if "Rain_now" in weather_value:
-                                self.sensor_data["weather"] = "🌧️ Raining Now"
-                            elif "No_rain" in weather_value:
-                                self.sensor_data["weather"] = "☀️ Sunny / No Rain"
-                            elif "Rain_tomorrow" in weather_value:
-                                self.sensor_data["weather"] = "🌧️ Rain expected tomorrow"
-                            elif "Rain_now_tomorrow" in weather_value:
-                                self.sensor_data["weather"] = "🌧️ Raining Now.\n 🌧️ Rain expected tomorrow"
-                            else:
-                                self.sensor_data["weather"] = "🌤️ Unknown"
+            while len(frames) < MAX_FRAMES_PER_DRAIN:
+                frames.append(self.serial_queue.get_nowait())
+        except queue.Empty:
+            pass
 
-            timestamp = datetime.now()
-            new_row = {
-                "timestamp": timestamp,
+        if frames:
+            self.process_serial_batch(frames)
+
+        if self.running:
+            self.after(INGEST_INTERVAL_MS, self.drain_serial_queue)
+            self.after(TELEMETRY_FLUSH_MS, self.flush_telemetry)
+
+    def flush_telemetry(self):
+        if not self.running:
+            return  # on_closing flushes the rest
+        self.telemetry_executor.submit(self.telemetry_store.flush).add_done_callback(self.report_telemetry_error)
+        self.after(TELEMETRY_FLUSH_MS, self.flush_telemetry)
+
+    def report_telemetry_error(self, future):
+        # Runs on the telemetry thread: print only, no widget access
+        error = future.exception()
+        if error is not None:
+            print(f"Error writing telemetry: {error}")
+
+    def process_serial_batch(self, frames):
+        new_samples = 0
+        self.raw_lines.extend((timestamp, line) for timestamp, line, _ in frames)
+        self.raw_pending = min(self.raw_pending + len(frames), RAW_LINES_MAX)
+        for timestamp, line, updates in frames:
+            if updates is None:
+                continue
+            self.sensor_data.update(updates)
+            sample = {
                 "temperature": self.sensor_data["temperature"],
                 "humidity": self.sensor_data["humidity"],
                 "moisture": self.sensor_data["moisture"],
                 "light": self.sensor_data["light"]
             }
-            self.sensor_history = pd.concat([self.sensor_history, pd.DataFrame([new_row])], ignore_index=True)
-
-            if len(self.sensor_history) > 100:
-                self.sensor_history = self.sensor_history.iloc[-100:]
+            self.sensor_history.append(timestamp, **sample)
+            self.telemetry_store.add(timestamp, **sample)  # Buffered, committed by flush_telemetry
+            new_samples += 1
+
+        self.frames_received += len(frames)
+        decoder = self.frame_decoder
+        self.frame_stats_label.configure(
+            text=f"Frames: {self.frames_received} | Dropped: {self.frames_dropped} | "
+                 f"Lost: {decoder.frames_lost} | Malformed: {decoder.malformed}"
+                 + (f" (last: {decoder.last_error})" if decoder.malformed else ""))
+
+        if not new_samples:
+            return
 
+        try:
             self.update_sensor_display()
 
         except Exception as e:
@@ -775,41 +1286,71 @@ class VegetationAnalysisGUI(ctk.CTk):
 
         self.update_history_charts()
 
-    def update_history_charts(self):
-        if not self.sensor_history.empty:
-            for ax in self.axs.flatten():
-                ax.clear()
-
-            self.axs[0, 0].plot(self.sensor_history["timestamp"], self.sensor_history["temperature"],
-                                color=ACCENT_BLUE, linewidth=2)
-            self.axs[0, 0].set_title("Temperature (°C)", color=TEXT_WHITE)
-            self.axs[0, 0].grid(True, color='#2a3a31')
-
-            self.axs[0, 1].plot(self.sensor_history["timestamp"], self.sensor_history["humidity"],
-                                color="#00bcd4", linewidth=2)
-            self.axs[0, 1].set_title("Humidity (%)", color=TEXT_WHITE)
-            self.axs[0, 1].grid(True, color='#2a3a31')
-
-            self.axs[1, 0].plot(self.sensor_history["timestamp"], self.sensor_history["moisture"],
-                                color=ACCENT_GREEN, linewidth=2)
-            self.axs[1, 0].set_title("Soil Moisture (%)", color=TEXT_WHITE)
-            self.axs[1, 0].grid(True, color='#2a3a31')
+    def set_history_range(self, value):
+        self.history_range = value
+        self.history_queried_at = 0.0
+        self.update_history_charts(rescale=True)
+
+    def update_history_charts(self, rescale=False):
+        # Only hands data to the line artists; drawing happens in render_history_charts
+        if self.history_charts is None or self.sensor_tabview.get() != HISTORY_TAB:
+            return  # Not visible; the data is loaded when the History tab is shown
+        span = HISTORY_RANGES[self.history_range]
+        if span is None:
+            self.history_query = None  # Drop a stored-range result still in flight
+            if len(self.sensor_history):
+                timestamps, values = self.sensor_history.window(HISTORY_CHART_POINTS)
+                self.history_charts.set_data(timestamps, values, rescale=rescale)
+            return
 
-            self.axs[1, 1].plot(self.sensor_history["timestamp"], self.sensor_history["light"],
-                                color=ACCENT_YELLOW, linewidth=2)
-            self.axs[1, 1].set_title("Light Level (%)", color=TEXT_WHITE)
-            self.axs[1, 1].grid(True, color='#2a3a31')
+        # Stored range: served from the telemetry store's rollups, re-queried periodically
+        now = time.monotonic()
+        if not rescale and now - self.history_queried_at < HISTORY_QUERY_REFRESH_S:
+            return
+        self.history_queried_at = now
+        end = datetime.now()
+        # query() flushes and reads SQLite, so it runs on the telemetry thread
+        self.history_query = self.telemetry_executor.submit(
+            self.telemetry_store.query, end - timedelta(seconds=span), end, max_points=HISTORY_QUERY_POINTS)
+        self.after(HISTORY_QUERY_POLL_MS, self.poll_history_query, self.history_query)
+
+    def poll_history_query(self, future):
+        if future is not self.history_query or not self.running:
+            return  # Superseded by another range, or closing
+        if not future.done():
+            self.after(HISTORY_QUERY_POLL_MS, self.poll_history_query, future)
+            return
+        self.history_query = None
+        try:
+            timestamps, values, _ = future.result()
+            self.history_charts.set_data(timestamps, values, rescale=True)
+        except Exception as e:
+            print(f"Error querying telemetry history: {e}")
 
-            for ax in self.axs.flatten():
-                ax.tick_params(colors=TEXT_WHITE)
-                plt.setp(ax.get_xticklabels(), rotation=45, ha="right")
+    def schedule_history_render(self):
+        if self.history_render_job is None and self.running:
+            self.history_render_job = self.after(CHART_FRAME_MS, self.render_history_charts)
 
-            self.fig.tight_layout()
-            self.canvas.draw()
+    def render_history_charts(self):
+        # Stops while another tab is selected; on_sensor_tab_changed restarts it
+        self.history_render_job = None
+        if not self.running or self.sensor_tabview.get() != HISTORY_TAB:
+            return
+        try:
+            self.history_charts.render()
+        except Exception as e:
+            print(f"Error drawing history charts: {e}")
+        self.schedule_history_render()
 
     def on_closing(self):
         self.running = False
+        if self.analysis_cancel is not None:
+            self.analysis_cancel.set()
         self.disconnect_serial()
+        self.output_sink.close()  # Finish pending PNG/CSV writes
+        self.telemetry_executor.shutdown(wait=True)  # Finish a running flush or query
+        self.telemetry_store.close()  # Write buffered telemetry
+        self.analysis_index.close()
         self.quit()  # Stop the Tkinter event loop
         self.destroy()  # Destroy the window
 
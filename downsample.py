@@ -0,0 +1,92 @@
+"""
+Level-of-detail reduction of time series for plotting.
+
+minmax_downsample keeps the lowest and highest sample of each bucket (in time
+order), so spikes survive and the drawn envelope is pixel-exact when there is
+one bucket per horizontal pixel. lttb implements Largest-Triangle-Three-Buckets
+for a smoother shape-preserving line. downsample_for_view picks the visible
+slice for the current zoom range and sizes the buckets from the axis width,
+so drawing cost follows screen pixels rather than sample count.
+"""
+import numpy as np
+
+
+def _finite_or(y, fill):
+    return np.where(np.isnan(y), fill, y)
+
+
+def minmax_downsample(x, y, n_buckets):
+    """
+    Splits (x, y) into n_buckets equal-count buckets and keeps each bucket's min and
+    max sample in their original order. Returns (x, y) with at most 2 * n_buckets points.
+    """
+    n = len(x)
+    if n_buckets < 1 or n <= 2 * n_buckets:
+        return x, y
+
+    size = n // n_buckets
+    usable = size * n_buckets
+    y_body = y[:usable].reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    lo = np.argmin(_finite_or(y_body, np.inf), axis=1) + offsets
+    hi = np.argmax(_finite_or(y_body, -np.inf), axis=1) + offsets
+
+    idx = np.stack([np.minimum(lo, hi), np.maximum(lo, hi)], axis=1).ravel()
+    if usable < n:
+        # Leftover tail forms one last bucket
+        tail_y = y[usable:]
+        tail = np.array([np.argmin(_finite_or(tail_y, np.inf)), np.argmax(_finite_or(tail_y, -np.inf))]) + usable
+        idx = np.concatenate([idx, np.sort(tail)])
+    return x[idx], y[idx]
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: picks n_out samples (always keeping the first
+    and last) that best preserve the visual shape of the line.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+
+    x64 = np.asarray(x, dtype=np.float64)
+    y64 = _finite_or(np.asarray(y, dtype=np.float64), 0.0)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out - 2 inner buckets
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        if stop <= start:
+            stop = start + 1
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], max(edges[i + 2], edges[i + 1] + 1))
+            cx, cy = x64[nxt].mean(), y64[nxt].mean()
+        else:
+            cx, cy = x64[-1], y64[-1]
+        bx, by = x64[start:stop], y64[start:stop]
+        area = np.abs((x64[a] - cx) * (by - y64[a]) - (x64[a] - bx) * (cy - y64[a]))
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+    return x[idx], y[idx]
+
+
+def downsample_for_view(x, y, x_range, pixel_width, method="minmax"):
+    """
+    Returns the samples to draw for an axis showing x_range (min, max) over
+    pixel_width pixels: the visible slice (plus one neighbour each side so lines
+    run to the edges), reduced to about one bucket per pixel.
+    """
+    if len(x) == 0:
+        return x, y
+    lo = max(int(np.searchsorted(x, x_range[0], side="left")) - 1, 0)
+    hi = min(int(np.searchsorted(x, x_range[1], side="right")) + 1, len(x))
+    x, y = x[lo:hi], y[lo:hi]
+
+    buckets = max(int(pixel_width), 1)
+    if method == "lttb":
+        return lttb(x, y, 2 * buckets)
+    return minmax_downsample(x, y, buckets)
@@ -0,0 +1,173 @@
+"""
+Histogram-first statistics for the quantised index rasters.
+
+NDVI and VARI outputs are uint8 levels, so a 256-bin histogram (one
+np.bincount, or the one index_kernels returns with the raster) holds
+everything the analyses report: mean, class percentages, the share of
+pixels on either side of any threshold and the histogram plot itself.
+Changing a threshold is then a lookup in 256 numbers instead of another
+pass over the pixels.
+
+Two value scales are in use for the same levels:
+    LEVEL_VALUES    level / 255 * 2 - 1, the index value (-1..1) used for
+                    the class percentages and means in the CSV logs
+    DISPLAY_VALUES  level / 255, the 0..1 scale of the heatmaps and of the
+                    combined analysis thresholds
+"""
+import numpy as np
+
+N_LEVELS = 256
+
+# Class order used by every counts array: healthy, moderate, sparse, barren
+CLASS_NAMES = ("healthy", "moderate", "sparse", "barren")
+NDVI_CLASS_THRESHOLDS = (0.6, 0.2)
+VARI_CLASS_THRESHOLDS = (0.5, 0.2)
+
+LEVEL_VALUES = (np.arange(N_LEVELS) / 255.0) * 2 - 1
+DISPLAY_VALUES = np.arange(N_LEVELS) / 255.0
+
+
+def level_classes(thresholds):
+    """
+    Class index (CLASS_NAMES order) of every level for (healthy_min, moderate_min)
+    index-value thresholds.
+    """
+    healthy_min, moderate_min = thresholds
+    v = LEVEL_VALUES
+    classes = np.full(N_LEVELS, 3, dtype=np.intp)  # barren (< 0)
+    classes[(v >= 0.0) & (v <= moderate_min)] = 2
+    classes[(v > moderate_min) & (v <= healthy_min)] = 1
+    classes[v > healthy_min] = 0
+    return classes
+
+
+NDVI_LEVEL_CLASSES = level_classes(NDVI_CLASS_THRESHOLDS)
+VARI_LEVEL_CLASSES = level_classes(VARI_CLASS_THRESHOLDS)
+
+
+def level_histogram(scaled):
+    """
+    256-bin histogram of a uint8 index raster (no copy of the pixels).
+    """
+    return np.bincount(np.asarray(scaled, dtype=np.uint8).ravel(), minlength=N_LEVELS)
+
+
+def summarize_histogram(hist, level_classes):
+    """
+    Turns a 256-bin histogram of quantised index values into
+    (mean index value, class percentages in CLASS_NAMES order).
+    """
+    total = hist.sum()
+    if total == 0:
+        return 0.0, np.zeros(len(CLASS_NAMES))
+    mean = float(np.dot(hist, LEVEL_VALUES) / total)
+    counts = np.bincount(level_classes, weights=hist, minlength=len(CLASS_NAMES))
+    return mean, counts / total * 100
+
+
+# ========== Thresholds ==========
+def threshold_level(threshold):
+    """
+    First level whose display value (level / 255) is >= threshold, i.e.
+    `scaled >= threshold_level(t)` selects the same pixels as `scaled / 255.0 >= t`.
+    """
+    return int(np.searchsorted(DISPLAY_VALUES, threshold, side="left"))
+
+
+def threshold_sweep(hist):
+    """
+    Percentage of pixels at or above every level: sweep[k] is the share with
+    scaled >= k (sweep[0] is 100 for a non-empty histogram).
+    """
+    total = hist.sum()
+    at_or_above = np.cumsum(hist[::-1])[::-1]
+    if total == 0:
+        return np.zeros(N_LEVELS)
+    return at_or_above / total * 100
+
+
+def percent_at_or_above(hist, threshold):
+    """
+    Percentage of pixels whose display value is >= threshold (0..1 scale).
+    """
+    level = threshold_level(threshold)
+    total = hist.sum()
+    if total == 0 or level >= N_LEVELS:
+        return 0.0
+    return float(hist[level:].sum() / total * 100)
+
+
+# ========== Joint NDVI/VARI histogram ==========
+def joint_histogram(ndvi_scaled, vari_scaled, strip_rows=256):
+    """
+    256x256 counts of (NDVI level, VARI level) pairs, built in row strips so
+    the temporary index stays small. Any pair of thresholds can then be
+    evaluated on the combined mask without the pixels (combined_percentages).
+    """
+    if ndvi_scaled.shape != vari_scaled.shape:
+        raise ValueError(f"NDVI {ndvi_scaled.shape} and VARI {vari_scaled.shape} sizes differ")
+    joint = np.zeros(N_LEVELS * N_LEVELS, dtype=np.int64)
+    for start in range(0, ndvi_scaled.shape[0], strip_rows):
+        stop = start + strip_rows
+        index = ndvi_scaled[start:stop].astype(np.uint16)
+        index <<= 8
+        index |= vari_scaled[start:stop]
+        joint += np.bincount(index.ravel(), minlength=N_LEVELS * N_LEVELS)
+    return joint.reshape(N_LEVELS, N_LEVELS)
+
+
+def combined_percentages(joint, ndvi_threshold, vari_threshold):
+    """
+    Percentages of the combined mask classes (non-vegetated, healthy,
+    potential stress) for thresholds on the 0..1 display scale.
+    """
+    total = joint.sum()
+    if total == 0:
+        return np.zeros(3)
+    ndvi_level = threshold_level(ndvi_threshold)
+    vari_level = threshold_level(vari_threshold)
+    vegetated = joint[ndvi_level:]
+    healthy = vegetated[:, vari_level:].sum()
+    stress = vegetated[:, :vari_level].sum()
+    return np.array([total - healthy - stress, healthy, stress]) / total * 100
+
+
+# ========== Plotting ==========
+def data_range(hist):
+    """
+    (min, max) display value present in the histogram, the range ax.hist
+    would pick for the pixels (widened by 0.5 either way for a single level,
+    as np.histogram does).
+    """
+    occupied = np.flatnonzero(hist)
+    if len(occupied) == 0:
+        return 0.0, 1.0
+    low, high = DISPLAY_VALUES[occupied[0]], DISPLAY_VALUES[occupied[-1]]
+    if low == high:
+        return low - 0.5, high + 0.5
+    return low, high
+
+
+def rebin(hist, bins=50, value_range=None):
+    """
+    Merges the 256 levels into `bins` equal-width bins over value_range on the
+    display scale (default: the data's range, like ax.hist). Levels outside
+    the range are dropped. Returns (counts, edges) ready for Axes.stairs.
+    """
+    low, high = value_range if value_range is not None else data_range(hist)
+    edges = np.linspace(low, high, bins + 1)
+    index = np.searchsorted(edges, DISPLAY_VALUES, side="right") - 1
+    index[DISPLAY_VALUES == high] = bins - 1  # Last bin is closed, as in np.histogram
+    inside = (index >= 0) & (index < bins)
+    return np.bincount(index[inside], weights=hist[inside], minlength=bins), edges
+
+
+def plot_level_histogram(ax, hist, bins=50, value_range=None, **kwargs):
+    """
+    Draws a pre-binned histogram (filled steps) of a 256-bin level histogram,
+    matching ax.hist(scaled.ravel() / 255.0, bins) without touching pixels:
+    bins span the data's range unless value_range is given.
+    Extra keyword arguments (label, color, alpha, ...) go to Axes.stairs.
+    """
+    counts, edges = rebin(hist, bins, value_range)
+    return ax.stairs(counts, edges, fill=True, **kwargs)
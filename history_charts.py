@@ -0,0 +1,147 @@
+"""
+Incremental, blitted rendering of the four sensor history charts.
+
+Each chart owns one persistent, animated Line2D. New samples only call
+set_data(); a full canvas draw (axes, ticks, grid) happens only when data
+leaves the current view or the canvas is resized, and everything else is a
+blit of the cached background plus the four lines. Callers mark the charts
+dirty as often as they like and call render() from a fixed-rate timer, so
+redraws are coalesced to that frame rate.
+
+The lines never hold more than about two points per horizontal pixel: the
+full series is kept here and reduced with downsample.downsample_for_view for
+the current zoom range and axis width whenever the data, the limits or the
+canvas size change, so a month of 1 Hz samples draws as fast as a hundred.
+"""
+import numpy as np
+import matplotlib.dates as mdates
+from downsample import downsample_for_view
+
+
+X_HEADROOM = 0.25   # Fraction of the visible span added ahead of the newest sample
+Y_PADDING = 0.1     # Fraction of the data range added above and below
+
+
+class HistoryCharts:
+    def __init__(self, fig, axes, canvas, specs, grid_color='#2a3a31', text_color='#ffffff',
+                 lod_method='minmax'):
+        """
+        specs: one (field, title, color) tuple per axes, in the same order.
+        lod_method: 'minmax' (keeps every spike) or 'lttb' (smoother shape).
+        """
+        self.fig = fig
+        self.canvas = canvas
+        self.fields = [field for field, _, _ in specs]
+        self.axes = list(axes)
+        self.lines = []
+        self.text_color = text_color
+        for ax, (field, title, color) in zip(self.axes, specs):
+            ax.set_title(title, color=text_color)
+            ax.grid(True, color=grid_color)
+            ax.tick_params(colors=text_color)
+            ax.tick_params(axis='x', labelrotation=45)
+            ax.xaxis_date()
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+            line, = ax.plot([], [], color=color, linewidth=2, animated=True)
+            self.lines.append(line)
+            ax.callbacks.connect('xlim_changed', self._on_xlim_changed)
+
+        self.lod_method = lod_method
+        self._dates = np.empty(0)
+        self._series = {field: np.empty(0) for field in self.fields}
+        self._lod_widths = [None] * len(self.axes)
+        self._lod_stale = False
+        self._background = None
+        self._dirty = False
+        self._needs_full_draw = True
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        # Any full draw (ours or a resize) refreshes the cached background
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        if self._lod_stale or self._lod_widths != [ax.bbox.width for ax in self.axes]:
+            self._apply_lod()
+        self._draw_lines()
+
+    def _on_xlim_changed(self, ax):
+        self._lod_stale = True
+        self._dirty = True
+
+    def _apply_lod(self):
+        # Hand each line only the samples that are visible, about two per pixel
+        for i, (ax, line, field) in enumerate(zip(self.axes, self.lines, self.fields)):
+            width = ax.bbox.width
+            x, y = downsample_for_view(self._dates, self._series[field], ax.get_xlim(),
+                                       width, self.lod_method)
+            line.set_data(x, y)
+            self._lod_widths[i] = width
+        self._lod_stale = False
+
+    def _draw_lines(self):
+        for ax, line in zip(self.axes, self.lines):
+            ax.draw_artist(line)
+
+    def set_data(self, timestamps, values, rescale=False):
+        """
+        timestamps: seconds (see ring_buffer.to_epoch_seconds); values: {field: array}.
+        rescale=True refits the axes to the data even if it is still in view
+        (e.g. when switching to a different time range).
+        """
+        dates = np.asarray(timestamps, dtype=np.float64) / 86400.0  # matplotlib date numbers
+        self._dates = dates
+        for ax, field in zip(self.axes, self.fields):
+            # Copy: ring buffer windows are overwritten as new samples arrive
+            y = np.array(values[field], dtype=np.float64)
+            self._series[field] = y
+            if not len(dates) or not np.isfinite(y).any():
+                continue
+            if rescale or self._out_of_view(ax, dates, y):
+                self._rescale(ax, dates, y)
+                self._needs_full_draw = True
+        self._lod_stale = True
+        self._dirty = True
+
+    def _out_of_view(self, ax, x, y):
+        x0, x1 = ax.get_xlim()
+        y0, y1 = ax.get_ylim()
+        y_min, y_max = np.nanmin(y), np.nanmax(y)
+        return x[0] < x0 or x[-1] > x1 or y_min < y0 or y_max > y1
+
+    def _rescale(self, ax, x, y):
+        span = max(x[-1] - x[0], 1.0 / 86400)  # at least one second
+        ax.set_xlim(x[0], x[-1] + span * X_HEADROOM)
+        y_min, y_max = float(np.nanmin(y)), float(np.nanmax(y))
+        pad = max((y_max - y_min) * Y_PADDING, 0.5)
+        ax.set_ylim(y_min - pad, y_max + pad)
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def render(self):
+        """
+        Draws pending changes: a blit when only the lines moved, a full draw otherwise.
+        Meant to be called from a fixed-rate timer.
+        """
+        if not self._dirty:
+            return
+        self._dirty = False
+        if self._lod_stale:
+            self._apply_lod()
+        if self._needs_full_draw or self._background is None:
+            self._needs_full_draw = False
+            for ax in self.axes:
+                for label in ax.get_xticklabels():
+                    label.set_horizontalalignment('right')
+            self.canvas.draw()  # triggers _on_draw, which caches the background and draws the lines
+            self.canvas.blit(self.fig.bbox)
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_lines()
+        self.canvas.blit(self.fig.bbox)
+
+    def invalidate(self):
+        """
+        Forces a full redraw on the next render (e.g. after the tab becomes visible).
+        """
+        self._needs_full_draw = True
+        self._dirty = True
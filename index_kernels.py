@@ -0,0 +1,151 @@
+"""
+Fused vegetation-index kernels.
+
+Both NDVI and VARI only ever see 8-bit inputs, so every possible output can be
+precomputed once into an integer lookup table holding the final quantised
+0–255 value. A frame is then one table gather plus one 256-bin histogram,
+and the class percentages and mean come from the histogram. Frames are
+processed in row strips so temporaries stay a few MB even on 12-MP images.
+The tables are built with the same float64 expressions NDVI.py/VARI.py
+always used, so the outputs are bit-identical to the old per-pixel code.
+"""
+import numpy as np
+
+# Optional accelerated backend; the pure-NumPy path below is always available
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+STRIP_ROWS = 256
+EPS = 1e-5
+
+# VARI numerator (g - r) and denominator (g + r - b) ranges
+VARI_NUM_OFFSET = 255
+VARI_DEN_OFFSET = 255
+VARI_DEN_SIZE = 766  # -255 .. 510
+
+
+def _quantise(index):
+    # Same scaling/cast the PNG outputs have always used
+    with np.errstate(invalid='ignore', over='ignore'):
+        return ((index + 1) / 2 * 255).astype(np.uint8)
+
+
+def _build_ndvi_lut():
+    red = np.arange(256)[:, None] / 255.0
+    nir = np.arange(256)[None, :] / 255.0
+    ndvi = (nir - red) / (nir + red + EPS)
+    return _quantise(ndvi)
+
+
+def _build_vari_lut():
+    num = np.arange(-VARI_NUM_OFFSET, 256, dtype=float)[:, None]
+    den = np.arange(-VARI_DEN_OFFSET, 511, dtype=float)[None, :]
+    vari = num / (den + EPS)
+    return _quantise(vari)
+
+
+NDVI_LUT = _build_ndvi_lut()                      # [red, nir] -> uint8
+VARI_LUT = _build_vari_lut()                      # [g - r + 255, g + r - b + 255] -> uint8
+
+_NDVI_LUT_FLAT = NDVI_LUT.ravel()
+_VARI_LUT_FLAT = VARI_LUT.ravel()
+
+
+# ========== NumPy backend ==========
+def _ndvi_numpy(red, nir, out, hist):
+    for start in range(0, red.shape[0], STRIP_ROWS):
+        stop = start + STRIP_ROWS
+        idx = red[start:stop].astype(np.uint16)
+        idx <<= 8
+        idx |= nir[start:stop]
+        strip = out[start:stop]
+        np.take(_NDVI_LUT_FLAT, idx, out=strip)
+        hist += np.bincount(strip.ravel(), minlength=256)
+
+
+def _vari_numpy(rgb, out, hist):
+    for start in range(0, rgb.shape[0], STRIP_ROWS):
+        stop = start + STRIP_ROWS
+        red = rgb[start:stop, :, 0].astype(np.int32)
+        green = rgb[start:stop, :, 1].astype(np.int32)
+        den = green + red
+        den -= rgb[start:stop, :, 2]
+        den += VARI_DEN_OFFSET
+        green -= red
+        green += VARI_NUM_OFFSET
+        green *= VARI_DEN_SIZE
+        green += den
+        strip = out[start:stop]
+        np.take(_VARI_LUT_FLAT, green, out=strip)
+        hist += np.bincount(strip.ravel(), minlength=256)
+
+
+# ========== numba backend ==========
+if njit is not None:
+    @njit(cache=True, nogil=True)
+    def _ndvi_numba(red, nir, lut, out, hist):
+        for i in range(red.shape[0]):
+            for j in range(red.shape[1]):
+                v = lut[red[i, j], nir[i, j]]
+                out[i, j] = v
+                hist[v] += 1
+
+    @njit(cache=True, nogil=True)
+    def _vari_numba(rgb, lut, out, hist):
+        for i in range(rgb.shape[0]):
+            for j in range(rgb.shape[1]):
+                r = np.int32(rgb[i, j, 0])
+                g = np.int32(rgb[i, j, 1])
+                b = np.int32(rgb[i, j, 2])
+                v = lut[g - r + 255, g + r - b + 255]
+                out[i, j] = v
+                hist[v] += 1
+
+    DEFAULT_BACKEND = "numba"
+else:
+    DEFAULT_BACKEND = "numpy"
+
+
+def _resolve_backend(backend):
+    backend = backend or DEFAULT_BACKEND
+    if backend == "numba" and njit is None:
+        raise ValueError("numba backend requested but numba is not installed")
+    if backend not in ("numpy", "numba"):
+        raise ValueError(f"Unknown backend: {backend}")
+    return backend
+
+
+def ndvi_kernel(red, nir, backend=None):
+    """
+    Computes the quantised NDVI image from uint8 red and NIR arrays.
+    Returns (ndvi_scaled uint8 array, 256-bin histogram of ndvi_scaled).
+    """
+    if red.shape != nir.shape:
+        raise ValueError(f"Red {red.shape} and NIR {nir.shape} image sizes differ")
+    red = np.asarray(red, dtype=np.uint8)
+    nir = np.asarray(nir, dtype=np.uint8)
+    out = np.empty(red.shape, dtype=np.uint8)
+    hist = np.zeros(256, dtype=np.int64)
+    if _resolve_backend(backend) == "numba":
+        _ndvi_numba(red, nir, NDVI_LUT, out, hist)
+    else:
+        _ndvi_numpy(red, nir, out, hist)
+    return out, hist
+
+
+def vari_kernel(rgb, backend=None):
+    """
+    Computes the quantised VARI image from a uint8 HxWx3 RGB array.
+    Returns (vari_scaled uint8 array, 256-bin histogram of vari_scaled).
+    """
+    rgb = np.asarray(rgb, dtype=np.uint8)
+    out = np.empty(rgb.shape[:2], dtype=np.uint8)
+    hist = np.zeros(256, dtype=np.int64)
+    if _resolve_backend(backend) == "numba":
+        _vari_numba(rgb, VARI_LUT, out, hist)
+    else:
+        _vari_numpy(rgb, out, hist)
+    return out, hist
+
@@ -0,0 +1,215 @@
+"""
+On-disk store of computed index rasters as memory-mappable .npy files.
+
+NDVI and VARI rasters are kept as the uint8 levels every consumer already
+works with (the PNG outputs and histogram_stats use the same levels, so
+float16 would double the size without adding information). Entries live
+in a hidden '.index_store' folder inside ndvi_outputs_date/ and
+vari_outputs_date/, named '<kind>_v<STORE_VERSION>_<key>.npy':
+
+    ndvi  key = hash of the RGB and NIR file contents
+    vari  key = hash of the RGB file contents
+
+A later analysis of the same images opens
+the raster with np.load(mmap_mode='r'), which is zero-copy and skips image
+decoding and the kernels. The OS pages the data in on demand and shares it
+between processes (e.g. the batch pool).
+
+Entries are written to a temporary file and renamed into place, so readers
+never see a partial raster. A hit refreshes the entry's mtime. Once the
+store grows past max_bytes, the least recently used entries are evicted.
+compact() also drops stale temporaries, entries written by other store
+versions and entries unused for max_age_days.
+"""
+import os
+import re
+import time
+import hashlib
+import numpy as np
+from result_cache import file_digest
+
+# Bump when the kernels or the stored layout change; older entries are compacted away
+STORE_VERSION = 1
+STORE_DIRNAME = ".index_store"
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+DEFAULT_MAX_AGE_DAYS = 90
+KINDS = ("ndvi", "vari")
+_NAME_RE = re.compile(rf"^({'|'.join(KINDS)})_v{STORE_VERSION}_[0-9a-f]{{64}}\.npy$")
+
+
+def raster_key(kind, *image_paths):
+    """
+    Store key for the `kind` raster of the given input images (by content).
+    """
+    h = hashlib.sha256()
+    h.update(kind.encode())
+    for path in image_paths:
+        h.update(file_digest(path).encode())
+    return h.hexdigest()
+
+
+class IndexStore:
+    """
+    Memory-mapped NDVI/VARI rasters next to the analysis output folders.
+    Safe to share between threads and processes: writes are atomic renames
+    and a missing file is simply a miss.
+    """
+
+    def __init__(self, ndvi_folder='ndvi_outputs_date', vari_folder='vari_outputs_date',
+                 max_bytes=DEFAULT_MAX_BYTES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.folders = {"ndvi": os.path.join(ndvi_folder, STORE_DIRNAME),
+                        "vari": os.path.join(vari_folder, STORE_DIRNAME)}
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        for folder in self.folders.values():
+            os.makedirs(folder, exist_ok=True)
+
+    def key_for(self, kind, *image_paths):
+        return raster_key(kind, *image_paths)
+
+    def _path(self, kind, key):
+        return os.path.join(self.folders[kind], f"{kind}_v{STORE_VERSION}_{key}.npy")
+
+    # ========== Public API ==========
+    def get(self, kind, key):
+        """
+        Read-only memmap of the stored raster, or None on a miss.
+        """
+        path = self._path(kind, key)
+        try:
+            array = np.load(path, mmap_mode='r')
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Dropping unreadable index raster {os.path.basename(path)}: {e}")
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # Mark as recently used for eviction
+        except OSError:
+            pass
+        return array
+
+    def put(self, kind, key, array):
+        """
+        Stores a raster (the caller keeps using its in-memory array).
+        Returns True if it was written.
+        """
+        path = self._path(kind, key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=array.dtype, shape=array.shape)
+            out[...] = array
+            out.flush()
+            del out
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not store index raster {os.path.basename(path)}: {e}")
+            self._remove(tmp_path)
+            return False
+        self.evict()
+        return True
+
+    # ========== Eviction and compaction ==========
+    def _entries(self):
+        # (mtime, size, path) of every file in the store folders
+        entries = []
+        for folder in self.folders.values():
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue  # Removed by another process meanwhile
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            # e.g. still mapped by a reader on Windows; retried by the next eviction
+            print(f"⚠️ Could not remove {os.path.basename(path)}: {e}")
+            return False
+
+    def evict(self):
+        """
+        Removes least recently used entries until the store fits max_bytes.
+        Returns (files removed, bytes freed).
+        """
+        entries = sorted(entry for entry in self._entries() if entry[2].endswith(".npy"))
+        total = sum(size for _, size, _ in entries)
+        removed, freed = 0, 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                removed += 1
+                freed += size
+            total -= size
+        return removed, freed
+
+    def compact(self):
+        """
+        Drops temporaries older than an hour, files from other store versions
+        or that are not valid .npy rasters, and entries unused for
+        max_age_days, then evicts down to max_bytes.
+        Returns (files removed, bytes freed).
+        """
+        now = time.time()
+        removed, freed = 0, 0
+        for mtime, size, path in self._entries():
+            if path.endswith(".tmp"):
+                stale = now - mtime > 3600  # Younger ones may still be being written
+            elif self.max_age_days is not None and now - mtime > self.max_age_days * 86400:
+                stale = True
+            else:
+                stale = not self._current(path)
+            if stale and self._remove(path):
+                removed += 1
+                freed += size
+
+        evicted, evicted_bytes = self.evict()
+        return removed + evicted, freed + evicted_bytes
+
+    def _current(self, path):
+        # Name of this store version and a readable 2-D uint8 .npy raster
+        if not _NAME_RE.match(os.path.basename(path)):
+            return False
+        try:
+            array = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            return False
+        return array.dtype == np.uint8 and array.ndim == 2
+
+    def usage(self):
+        """
+        (entries, bytes) currently stored.
+        """
+        entries = [entry for entry in self._entries() if entry[2].endswith(".npy")]
+        return len(entries), sum(size for _, size, _ in entries)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or compact the memory-mapped NDVI/VARI raster store")
+    parser.add_argument("--ndvi-folder", default="ndvi_outputs_date")
+    parser.add_argument("--vari-folder", default="vari_outputs_date")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / 1e6,
+                        help="Size budget; least recently used rasters beyond it are evicted")
+    parser.add_argument("--max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS,
+                        help="Rasters not used for this long are dropped by --compact")
+    parser.add_argument("--compact", action="store_true", help="Remove stale, foreign and over-budget entries")
+    args = parser.parse_args()
+
+    store = IndexStore(args.ndvi_folder, args.vari_folder, max_bytes=int(args.max_mb * 1e6),
+                       max_age_days=args.max_age_days)
+    if args.compact:
+        removed, freed = store.compact()
+        print(f"♻️ Removed {removed} files, freed {freed / 1e6:.1f} MB")
+    count, size = store.usage()
+    print(f"📊 {count} rasters, {size / 1e6:.1f} MB (budget {store.max_bytes / 1e6:.0f} MB)")
@@ -36,6 +36,15 @@
 #define MOISTURE_THRESHOLD   40.0     // % 
 #define LIGHT_THRESHOLD      45.0     // % 
 
+// Telemetry format: 0 = ASCII key=value lines, 1 = 24-byte binary frames
+// (layout documented in telemetry.py; the PC side auto-detects both)
+#ifndef TELEMETRY_BINARY
+#define TELEMETRY_BINARY     0
+#endif
+#define FRAME_SYNC_0         0xAA
+#define FRAME_SYNC_1         0x55
+#define FRAME_SIZE           24
+
 /* USER CODE END PM */
 
 /* Private variables ---------------------------------------------------------*/
@@ -57,6 +66,7 @@ char weather_condition[32] = "unknown";
 
 // flags
 uint8_t temp_ok = 0, moisture_ok = 0, light_ok = 0;
+uint16_t frame_seq = 0;
 
 /* USER CODE END PV */
 
@@ -232,6 +242,47 @@ void control_motor(float moisture, const char *weather) {
   }
 }
 
+// CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), matches binascii.crc_hqx on the PC
+uint16_t crc16_ccitt(const uint8_t *data, uint16_t len) {
+  uint16_t crc = 0xFFFF;
+  for (uint16_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (uint8_t b = 0; b < 8; b++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+uint8_t weather_code(const char *weather) {
+  if (strcmp(weather, "No_rain") == 0) return 1;
+  if (strcmp(weather, "Rain_now") == 0) return 2;
+  if (strcmp(weather, "Rain_tomorrow") == 0) return 3;
+  if (strcmp(weather, "Rain_now_tomorrow") == 0) return 4;
+  return 0;
+}
+
+// Little-endian frame: sync, seq, 4 x float, flags, weather code, CRC of bytes 2..21
+void send_binary_frame(uint8_t motor_on) {
+  uint8_t frame[FRAME_SIZE];
+  frame[0] = FRAME_SYNC_0;
+  frame[1] = FRAME_SYNC_1;
+  frame[2] = frame_seq & 0xFF;
+  frame[3] = frame_seq >> 8;
+  memcpy(&frame[4], &Temperature, 4);
+  memcpy(&frame[8], &Humidity, 4);
+  memcpy(&frame[12], &moisture, 4);
+  memcpy(&frame[16], &light, 4);
+  frame[20] = temp_ok | (moisture_ok << 1) | (light_ok << 2) | (motor_on << 3);
+  frame[21] = weather_code(weather_condition);
+  uint16_t crc = crc16_ccitt(&frame[2], 20);
+  frame[22] = crc & 0xFF;
+  frame[23] = crc >> 8;
+  frame_seq++;
+
+  HAL_UART_Transmit(&huart2, frame, FRAME_SIZE, 100);
+}
+
 void HAL_TIM_PeriodElapsedCallback(TIM_HandleTypeDef *htim) {
     if (htim->Instance == TIM2) {
         read_temp_hum(&Temperature, &Humidity);
@@ -243,6 +294,9 @@ void HAL_TIM_PeriodElapsedCallback(TIM_HandleTypeDef *htim) {
         moisture_ok = (moisture >= MOISTURE_THRESHOLD) & 0x01;
         light_ok = (light >= LIGHT_THRESHOLD) & 0x01;
         
+#if TELEMETRY_BINARY
+        send_binary_frame(moisture < MOISTURE_THRESHOLD && strcmp(weather_condition, "No_rain") == 0);
+#else
         // Send data as key-value pairs
         char msg[256];
         snprintf(msg, sizeof(msg),
@@ -254,6 +308,7 @@ void HAL_TIM_PeriodElapsedCallback(TIM_HandleTypeDef *htim) {
             (moisture < MOISTURE_THRESHOLD && strcmp(weather_condition, "No_rain") == 0) ? "ON" : "OFF");
         
         HAL_UART_Transmit(&huart2, (uint8_t*)msg, strlen(msg), 100);
+#endif
     }
 }
 /* USER CODE END PFP */
@@ -0,0 +1,73 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from results_store import append_result
+
+
+class SyncSink:
+    """
+    Writes index images and result rows immediately on the calling thread.
+    """
+
+    def save_image(self, array, path):
+        Image.fromarray(array).save(path)
+
+    def append_row(self, csv_path, row, columns):
+        append_result(csv_path, row, columns)
+
+    def wait(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class AsyncSink:
+    """
+    Queues PNG encodes and CSV appends on a background writer thread so the
+    caller can carry on with the in-memory arrays straight away.
+    The arrays handed over must not be modified afterwards.
+    """
+
+    def __init__(self, max_workers=1):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="output-sink")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _submit(self, fn, *args):
+        future = self._executor.submit(fn, *args)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+        error = future.exception()
+        if error is not None:
+            print(f"❌ Background write failed: {error}")
+
+    def save_image(self, array, path):
+        return self._submit(SYNC_SINK.save_image, array, path)
+
+    def append_row(self, csv_path, row, columns):
+        return self._submit(SYNC_SINK.append_row, csv_path, row, columns)
+
+    def wait(self):
+        """
+        Blocks until every write queued so far has finished.
+        """
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            try:
+                future.result()
+            except Exception:
+                pass  # already reported by _done
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+SYNC_SINK = SyncSink()
@@ -0,0 +1,162 @@
+"""
+Multi-resolution pyramids of index rasters and viewport-driven imshow.
+
+build_pyramid halves a uint8 raster until it fits in a few hundred pixels
+(2x2 mean for continuous indices, nearest sample for class masks).
+ViewportImage keeps one AxesImage showing only the pyramid level and the
+tile-aligned region that match the axes' current limits and on-screen size,
+and swaps in finer tiles as the user zooms or pans (xlim/ylim changes) or the
+canvas is resized. A 12-MP NDVI map is therefore drawn from a few hundred
+thousand pixels instead of being resampled from full resolution on every draw.
+"""
+import math
+import numpy as np
+
+MIN_LEVEL_SIDE = 256   # Coarsest level is the first whose longer side is at most this
+TILE_SIZE = 256        # Regions are snapped to this grid (in level pixels) so small pans reuse them
+
+
+def _halve_mean(level):
+    h, w = level.shape[0] // 2 * 2, level.shape[1] // 2 * 2
+    blocks = level[:h, :w].reshape(h // 2, 2, w // 2, 2).astype(np.uint16)
+    return ((blocks.sum(axis=(1, 3)) + 2) >> 2).astype(level.dtype)
+
+
+def _halve_nearest(level):
+    return np.ascontiguousarray(level[::2, ::2])
+
+
+def build_pyramid(array, categorical=False, min_side=MIN_LEVEL_SIDE):
+    """
+    Returns [full resolution, 1/2, 1/4, ...] down to the first level whose
+    longer side is at most min_side. categorical=True samples instead of
+    averaging, so class labels stay valid.
+    """
+    halve = _halve_nearest if categorical else _halve_mean
+    levels = [array]
+    while max(levels[-1].shape[:2]) > min_side and min(levels[-1].shape[:2]) >= 2:
+        levels.append(halve(levels[-1]))
+    return levels
+
+
+class ViewportImage:
+    """
+    Shows a pyramid on `ax` at the resolution of the current view.
+    Extra imshow keyword arguments (cmap, vmin, vmax, ...) are passed through;
+    scale multiplies the displayed values (e.g. 1/255 to show a uint8 index as 0–1).
+    levels can also be a lazy sequence that computes levels on access; if it
+    has a `shapes` attribute, only the level being shown is ever computed.
+    """
+
+    def __init__(self, ax, levels, scale=None, **imshow_kwargs):
+        self.ax = ax
+        self.levels = levels
+        self.scale = scale
+        self.shapes = getattr(levels, "shapes", None) or [level.shape[:2] for level in levels]
+        self.height, self.width = self.shapes[0][:2]
+        self._region = None
+        self._cids = []
+        coarsest = len(levels) - 1
+        self.image = ax.imshow(self._values(levels[coarsest]), interpolation="nearest",
+                               extent=(-0.5, self.width - 0.5, self.height - 0.5, -0.5), **imshow_kwargs)
+        self._region = (coarsest, 0, self.shapes[coarsest][0], 0, self.shapes[coarsest][1])
+        ax.set_xlim(-0.5, self.width - 0.5)
+        ax.set_ylim(self.height - 0.5, -0.5)
+        ax.set_autoscale_on(False)  # set_extent must not move the view
+        self.connect()
+
+    def arrays(self):
+        """
+        Arrays this view keeps alive (for memory accounting, e.g. result_cache).
+        Lazy levels report theirs through an `arrays()` method of their own.
+        """
+        if hasattr(self.levels, "arrays"):
+            return list(self.levels.arrays())
+        return list(self.levels)
+
+    def _values(self, block):
+        if self.scale is None:
+            return block
+        return block.astype(np.float32) * np.float32(self.scale)
+
+    def connect(self):
+        """
+        Subscribes to limit changes and canvas resizes (again, e.g. after the
+        figure was unpickled, which drops callbacks). Safe to call repeatedly.
+        """
+        self.disconnect()
+        self._cids = [("ax", self.ax.callbacks.connect("xlim_changed", self._on_change)),
+                      ("ax", self.ax.callbacks.connect("ylim_changed", self._on_change))]
+        canvas = self.ax.figure.canvas
+        if canvas is not None:
+            self._cids.append(("canvas", canvas.mpl_connect("resize_event", self._on_change)))
+
+    def disconnect(self):
+        for owner, cid in self._cids:
+            if owner == "ax":
+                self.ax.callbacks.disconnect(cid)
+            elif self.ax.figure.canvas is not None:
+                self.ax.figure.canvas.mpl_disconnect(cid)
+        self._cids = []
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_cids"] = []
+        return state
+
+    def _on_change(self, *args):
+        self.update()
+
+    def level_for(self, data_width, pixel_width):
+        # Coarsest level that still gives at least one level pixel per screen pixel
+        if pixel_width <= 0:
+            return len(self.levels) - 1
+        ratio = data_width / pixel_width
+        level = int(math.floor(math.log2(ratio))) if ratio > 1 else 0
+        return max(0, min(level, len(self.levels) - 1))
+
+    def update(self):
+        """
+        Swaps in the level/region for the current view; returns True if the image changed.
+        """
+        x0, x1 = sorted(self.ax.get_xlim())
+        y0, y1 = sorted(self.ax.get_ylim())
+        bbox = self.ax.get_window_extent()
+        level = min(self.level_for(x1 - x0, bbox.width), self.level_for(y1 - y0, bbox.height))
+
+        factor = 2 ** level
+        rows, cols = self.shapes[level][:2]
+        # Visible region in level pixels, snapped outwards to the tile grid
+        r0 = max(int((y0 + 0.5) / factor) // TILE_SIZE * TILE_SIZE, 0)
+        c0 = max(int((x0 + 0.5) / factor) // TILE_SIZE * TILE_SIZE, 0)
+        r1 = min(-(-int(math.ceil((y1 + 0.5) / factor)) // TILE_SIZE) * TILE_SIZE, rows)
+        c1 = min(-(-int(math.ceil((x1 + 0.5) / factor)) // TILE_SIZE) * TILE_SIZE, cols)
+        if r1 <= r0 or c1 <= c0:
+            return False
+        region = (level, r0, r1, c0, c1)
+        if region == self._region:
+            return False
+
+        self._region = region
+        self.image.set_data(self._values(self.levels[level][r0:r1, c0:c1]))
+        # Level pixels map back to full-resolution data coordinates
+        self.image.set_extent((c0 * factor - 0.5, c1 * factor - 0.5, r1 * factor - 0.5, r0 * factor - 0.5))
+        return True
+
+    def refresh(self):
+        """
+        Redraws the current view from the levels, e.g. after a lazy pyramid's
+        inputs changed. Only the shown region of one level is read.
+        """
+        self._region = None
+        return self.update()
+
+
+def relink_viewports(fig):
+    """
+    Reconnects the ViewportImages stored on fig.viewports (see
+    Combined_Analysis_NDVI_NIR) and refits them to the current layout.
+    """
+    for view in getattr(fig, "viewports", []):
+        view.connect()
+        view.update()
@@ -0,0 +1,188 @@
+import os
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Bump when the cached payload layout or the analysis itself changes
+CACHE_VERSION = 2
+
+
+_digest_memo = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """
+    SHA-256 of a file's contents. Memoised on (path, size, mtime) so
+    re-hashing an unchanged file is free.
+    """
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _digest_lock:
+        digest = _digest_memo.get(memo_key)
+    if digest is not None:
+        return digest
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    digest = h.hexdigest()
+    with _digest_lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def analysis_key(rgb_image_path, nir_image_path, ndvi_threshold, vari_threshold):
+    """
+    Cache key for one combined analysis: the contents of both images plus the thresholds.
+    """
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}".encode())
+    h.update(file_digest(rgb_image_path).encode())
+    h.update(file_digest(nir_image_path).encode())
+    h.update(f"{float(ndvi_threshold)!r}:{float(vari_threshold)!r}".encode())
+    return h.hexdigest()
+
+
+def _entry_size(figure, results):
+    # Result arrays plus the raster pyramids the figure holds (fig.viewports, see
+    # raster_pyramid); level 0 is usually the result array itself, so count each array once
+    arrays = [v for v in results.values() if isinstance(v, np.ndarray)]
+    for view in getattr(figure, "viewports", []):
+        arrays.extend(view.arrays())
+    return sum({id(a): a.nbytes for a in arrays}.values())
+
+
+class ResultCache:
+    """
+    Content-addressed cache of combined NDVI/VARI analyses.
+
+    Each entry holds the index arrays, the stats and the rendered figure.
+    Recent entries stay in memory (LRU, bounded by the bytes of the result
+    arrays and of the figure's raster pyramids); all entries
+    are also kept under cache_dir as '<key>.npz' (arrays) + '<key>.pkl'
+    (stats and pickled figure), evicted least-recently-used once the folder
+    grows past max_disk_bytes.
+    """
+
+    def __init__(self, cache_dir='analysis_cache', max_memory_bytes=256 * 1024 * 1024,
+                 max_disk_bytes=1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()  # key -> (figure, results, size)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key_for(self, rgb_image_path, nir_image_path, ndvi_threshold, vari_threshold):
+        return analysis_key(rgb_image_path, nir_image_path, ndvi_threshold, vari_threshold)
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".npz", base + ".pkl"
+
+    # ========== Memory tier ==========
+    def _remember(self, key, figure, results):
+        size = _entry_size(figure, results)
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= self._memory.pop(key)[2]
+            self._memory[key] = (figure, results, size)
+            self._memory_bytes += size
+            # Always keep the newest entry, even if it alone exceeds the budget
+            while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+                _, (_, _, old_size) = self._memory.popitem(last=False)
+                self._memory_bytes -= old_size
+
+    # ========== Disk tier ==========
+    def _load(self, key):
+        npz_path, pkl_path = self._paths(key)
+        if not (os.path.exists(npz_path) and os.path.exists(pkl_path)):
+            return None
+        try:
+            with np.load(npz_path) as arrays:
+                results = {name: arrays[name] for name in arrays.files}
+            with open(pkl_path, "rb") as f:
+                payload = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️ Dropping unreadable cache entry {key}: {e}")
+            self._remove(key)
+            return None
+        results.update(payload["stats"])
+        # Mark as recently used for disk LRU
+        for path in (npz_path, pkl_path):
+            os.utime(path)
+        return payload["figure"], results
+
+    def _store(self, key, figure, results):
+        npz_path, pkl_path = self._paths(key)
+        arrays = {k: v for k, v in results.items() if isinstance(v, np.ndarray)}
+        stats = {k: v for k, v in results.items() if not isinstance(v, np.ndarray)}
+        try:
+            tmp_npz = npz_path + ".tmp"
+            with open(tmp_npz, "wb") as f:
+                np.savez(f, **arrays)
+            tmp_pkl = pkl_path + ".tmp"
+            with open(tmp_pkl, "wb") as f:
+                pickle.dump({"stats": stats, "figure": figure}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_npz, npz_path)
+            os.replace(tmp_pkl, pkl_path)
+        except Exception as e:
+            print(f"⚠️ Could not write cache entry {key}: {e}")
+            self._remove(key)
+            return
+        self._evict_disk()
+
+    def _remove(self, key):
+        for path in self._paths(key):
+            for p in (path, path + ".tmp"):
+                if os.path.exists(p):
+                    os.remove(p)
+
+    def _evict_disk(self):
+        entries = {}
+        for name in os.listdir(self.cache_dir):
+            key, ext = os.path.splitext(name)
+            if ext not in (".npz", ".pkl"):
+                continue
+            st = os.stat(os.path.join(self.cache_dir, name))
+            size, mtime = entries.get(key, (0, 0))
+            entries[key] = (size + st.st_size, max(mtime, st.st_mtime))
+
+        total = sum(size for size, _ in entries.values())
+        for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_disk_bytes:
+                break
+            self._remove(key)
+            total -= size
+
+    # ========== Public API ==========
+    def get(self, key):
+        """
+        Returns (figure, results) for key, or None on a miss.
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry[0], entry[1]
+        loaded = self._load(key)
+        if loaded is None:
+            return None
+        self._remember(key, *loaded)
+        return loaded
+
+    def put(self, key, figure, results):
+        self._remember(key, figure, results)
+        self._store(key, figure, results)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        for name in os.listdir(self.cache_dir):
+            os.remove(os.path.join(self.cache_dir, name))
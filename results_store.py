@@ -0,0 +1,138 @@
+import os
+import csv
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Column layouts of the analysis logs (same order the CSVs have always used)
+NDVI_COLUMNS = ["DateTime", "RGB Image", "NIR Image", "NDVI Image", "Mean NDVI",
+                "Healthy (%)", "Moderate (%)", "Sparse (%)", "Non-Vegetated (%)"]
+VARI_COLUMNS = ["DateTime", "Image Name", "Mean VARI",
+                "Healthy (%)", "Moderate (%)", "Sparse (%)", "Non-Vegetated (%)"]
+
+
+@contextmanager
+def _file_lock(lock_path):
+    """
+    Exclusive inter-process lock held on a sidecar '.lock' file.
+    The file is left in place (and gitignored): deleting it on release would
+    let another process lock a fresh file while a third still holds the old one.
+    """
+    with open(lock_path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ResultsStore:
+    """
+    Append-only CSV log of analysis results.
+
+    Rows are buffered in memory and appended to the end of the file in batches,
+    so each row costs O(1) I/O no matter how long the history is. Flushes take a
+    lock on '<csv_path>.lock', which keeps concurrent workers (threads or
+    processes) from interleaving partial writes.
+    """
+
+    def __init__(self, csv_path, columns, flush_every=1, fsync=False):
+        self.csv_path = csv_path
+        self.columns = list(columns)
+        self.flush_every = max(1, flush_every)
+        self.fsync = fsync
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def append(self, row):
+        with self._lock:
+            self._buffer.append(row)
+            pending = len(self._buffer)
+        if pending >= self.flush_every:
+            self.flush()
+
+    def extend(self, rows):
+        with self._lock:
+            self._buffer.extend(rows)
+            pending = len(self._buffer)
+        if pending >= self.flush_every:
+            self.flush()
+
+    def _read_header(self):
+        # Only the first line is read, never the whole history
+        with open(self.csv_path, "r", newline="", encoding="utf-8") as f:
+            return next(csv.reader(f), None)
+
+    def flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+
+        folder = os.path.dirname(self.csv_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with _file_lock(self.csv_path + ".lock"):
+            fieldnames = self.columns
+            write_header = not os.path.exists(self.csv_path) or os.path.getsize(self.csv_path) == 0
+            if not write_header:
+                # Follow the column order already on disk so old logs stay aligned
+                fieldnames = self._read_header() or self.columns
+
+            with open(self.csv_path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+                if write_header:
+                    writer.writeheader()
+                writer.writerows(rows)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+        return len(rows)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def read(self):
+        """
+        Loads the whole log as a DataFrame (flushes pending rows first).
+        """
+        import pandas as pd  # Writers (and the dashboard) never need pandas
+        self.flush()
+        if not os.path.exists(self.csv_path):
+            return pd.DataFrame(columns=self.columns)
+        return pd.read_csv(self.csv_path)
+
+    def export_csv(self, dest_path):
+        """
+        Writes the log to dest_path using the canonical column layout.
+        """
+        df = self.read().reindex(columns=self.columns)
+        df.to_csv(dest_path, index=False)
+        return dest_path
+
+
+def append_result(csv_path, row, columns):
+    """
+    Appends a single result row to csv_path without re-reading the file.
+    """
+    ResultsStore(csv_path, columns).append(row)
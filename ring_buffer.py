@@ -0,0 +1,118 @@
+from datetime import datetime
+import numpy as np
+
+SENSOR_FIELDS = ("temperature", "humidity", "moisture", "light")
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch_seconds(timestamp):
+    """
+    Naive datetime -> seconds since 1970-01-01 on the same wall clock
+    (no timezone shift, so charts show the time the sample was logged).
+    """
+    if isinstance(timestamp, datetime):
+        return (timestamp.replace(tzinfo=None) - _EPOCH).total_seconds()
+    return float(timestamp)
+
+
+class SensorRingBuffer:
+    """
+    Fixed-capacity, preallocated columnar history of sensor samples.
+
+    Every sample is written twice, at slot i and i + capacity, so the most
+    recent N samples are always one contiguous slice. window() and view()
+    therefore return NumPy views with no copying, and appending costs the
+    same whatever the capacity.
+    Timestamps are stored as float64 seconds (see to_epoch_seconds),
+    sensor values as float32.
+    """
+
+    def __init__(self, capacity=7 * 24 * 3600, fields=SENSOR_FIELDS):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self._timestamps = np.zeros(2 * capacity, dtype=np.float64)
+        self._values = {name: np.zeros(2 * capacity, dtype=np.float32) for name in self.fields}
+        self._head = 0   # Next slot to write, in [0, capacity)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, **values):
+        """
+        Adds one sample; missing fields are stored as NaN.
+        """
+        i = self._head
+        j = i + self.capacity
+        t = to_epoch_seconds(timestamp)
+        self._timestamps[i] = self._timestamps[j] = t
+        for name, column in self._values.items():
+            column[i] = column[j] = values.get(name, np.nan)
+        self._head = (i + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def extend(self, rows):
+        """
+        Adds samples from an iterable of dicts with a 'timestamp' key plus field values.
+        """
+        for row in rows:
+            row = dict(row)
+            self.append(row.pop("timestamp"), **row)
+
+    def _bounds(self, last):
+        n = self._count if last is None else max(0, min(last, self._count))
+        end = self._head + self.capacity
+        return end - n, end
+
+    def window(self, last=None):
+        """
+        Zero-copy views of the newest `last` samples (all samples if None),
+        oldest first. Returns (timestamps, {field: values}).
+        The views are overwritten as new samples arrive; copy them to keep them.
+        """
+        start, end = self._bounds(last)
+        return self._timestamps[start:end], {name: column[start:end] for name, column in self._values.items()}
+
+    def view(self, field, last=None):
+        start, end = self._bounds(last)
+        if field == "timestamp":
+            return self._timestamps[start:end]
+        return self._values[field][start:end]
+
+    def time_range(self, start_time, end_time=None):
+        """
+        Zero-copy window of the samples with start_time <= timestamp <= end_time.
+        Timestamps only ever increase, so this is a binary search.
+        """
+        timestamps, _ = self.window()
+        lo = np.searchsorted(timestamps, to_epoch_seconds(start_time), side="left")
+        hi = len(timestamps) if end_time is None else \
+            np.searchsorted(timestamps, to_epoch_seconds(end_time), side="right")
+        start, _ = self._bounds(None)
+        return (self._timestamps[start + lo:start + hi],
+                {name: column[start + lo:start + hi] for name, column in self._values.items()})
+
+    def latest(self):
+        if self._count == 0:
+            return None
+        i = (self._head - 1) % self.capacity
+        row = {"timestamp": self._timestamps[i]}
+        row.update({name: column[i] for name, column in self._values.items()})
+        return row
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+
+    def to_dataframe(self, last=None):
+        """
+        Copies the newest samples into a DataFrame (timestamp + field columns) for export.
+        """
+        import pandas as pd  # Only needed for export; kept out of dashboard startup
+        timestamps, values = self.window(last)
+        df = pd.DataFrame({name: column.astype(np.float64) for name, column in values.items()})
+        df.insert(0, "timestamp", pd.to_datetime(timestamps, unit="s"))
+        return df
@@ -0,0 +1,311 @@
+"""
+Replay and synthetic-load harness for the serial ingestion path.
+
+Feeds telemetry frames into a pseudo-terminal at a fixed rate and measures
+what comes out the other side:
+
+    python serial_replay.py --rate 200 --duration 30             # dashboard, synthetic ASCII
+    python serial_replay.py --binary --rate 2000 --headless      # decoder + storage only, no Tk
+    python serial_replay.py --replay session.log --rate 50       # recorded firmware output
+
+Every frame is tagged with a sequence number ("#<n> " prefix for ASCII,
+the seq field for binary frames), which survives parsing, so each frame's
+send time can be matched when it reaches the gauges. The report gives
+end-to-end latency percentiles, frames dropped or lost, UI frame time
+(batch processing and Tk event-loop lag) and memory growth (tracemalloc).
+POSIX only (needs os.openpty).
+"""
+import os
+import re
+import sys
+import time
+import tty
+import queue
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from datetime import datetime
+import numpy as np
+from telemetry import FrameDecoder, WEATHER_CODES, encode_frame
+
+HEARTBEAT_MS = 10   # Tk event-loop lag probe interval
+_SEQ_RE = re.compile(r"#(\d+) ")
+_LOG_PREFIX_RE = re.compile(r"^\d{2}:\d{2}:\d{2} - ")  # Lines copied from the raw data tab
+
+
+# ========== Frame sources ==========
+def synthetic_frames(binary=False):
+    """
+    Endless frames in the main.c format with slowly varying readings.
+    Yields (seq, bytes).
+    """
+    seq = 0
+    while True:
+        phase = seq / 600.0
+        temperature = 25 + 5 * np.sin(phase)
+        humidity = 60 + 10 * np.cos(phase)
+        moisture = 40 + 15 * np.sin(phase / 3)
+        light = 50 + 40 * np.sin(phase / 7)
+        weather = WEATHER_CODES[1 + (seq // 1000) % 4]
+        motor = moisture < 40 and weather == "No_rain"
+        if binary:
+            flags = (10 <= temperature <= 35) | (moisture >= 40) << 1 | (light >= 45) << 2 | motor << 3
+            frame = encode_frame(seq, temperature, humidity, moisture, light, flags, weather)
+        else:
+            frame = (f"#{seq} temperature={temperature:.1f}; humidity={humidity:.1f}; "
+                     f"moisture={moisture:.1f}; light={light:.1f};"
+                     f"temp_status={int(10 <= temperature <= 35)} ;moisture_status={int(moisture >= 40)}; "
+                     f"light_status={int(light >= 45)};weather={weather}; "
+                     f"Motor={'ON' if motor else 'OFF'}\n;").encode("utf-8")
+        yield seq, frame
+        seq += 1
+
+
+def recorded_frames(path):
+    """
+    Loops over a recorded log (raw firmware lines, or lines copied from the
+    raw data tab), tagging each line with a sequence number. Yields (seq, bytes).
+    """
+    with open(path, encoding="utf-8", errors="replace") as f:
+        lines = [_LOG_PREFIX_RE.sub("", line).strip(" \t\r\n;") for line in f]
+    lines = [line for line in lines if line]
+    if not lines:
+        raise ValueError(f"No frames in {path}")
+    seq = 0
+    while True:
+        yield seq, f"#{seq} {lines[seq % len(lines)]}\n".encode("utf-8")
+        seq += 1
+
+
+class PtyFeeder(threading.Thread):
+    """
+    Writes frames into the master side of a pty at `rate` frames/s.
+    The reader opens `device` (the slave side) like a real serial port.
+    """
+
+    def __init__(self, frames, rate, duration):
+        super().__init__(daemon=True)
+        self.frames = frames
+        self.rate = rate
+        self.duration = duration
+        self.master, slave = os.openpty()
+        tty.setraw(slave)
+        self.device = os.ttyname(slave)
+        self._slave = slave
+        self.sent_at = {}   # seq & 0xFFFF -> perf_counter at write
+        self.sent = 0
+        self.stop_event = threading.Event()
+
+    def run(self):
+        start = time.perf_counter()
+        end = start + self.duration
+        for seq, frame in self.frames:
+            due = start + self.sent / self.rate
+            now = time.perf_counter()
+            if due >= end or self.stop_event.is_set():
+                break
+            if due > now:
+                time.sleep(due - now)
+            self.sent_at[seq & 0xFFFF] = time.perf_counter()
+            os.write(self.master, frame)  # Blocks if the reader falls far behind
+            self.sent += 1
+
+    def close(self):
+        self.stop_event.set()
+        os.close(self.master)
+        os.close(self._slave)
+
+
+# ========== Measurement ==========
+class Recorder:
+    def __init__(self, feeder):
+        self.feeder = feeder
+        self.latencies = []
+        self.batch_times = []
+        self.loop_lag = []
+        self.received = 0
+        self.memory_start = None  # Heap once the pipeline is warm (first batch displayed)
+        self.memory_end = None    # Heap at the last batch, before teardown
+
+    def frames_done(self, lines):
+        # Called once a batch has reached the display
+        now = time.perf_counter()
+        if tracemalloc.is_tracing():
+            self.memory_end = tracemalloc.get_traced_memory()[0]
+            if self.memory_start is None:
+                self.memory_start = self.memory_end
+        for line in lines:
+            match = _SEQ_RE.match(line)
+            if match is None:
+                continue
+            sent = self.feeder.sent_at.get(int(match.group(1)) & 0xFFFF)
+            if sent is not None:
+                self.latencies.append(now - sent)
+        self.received += len(lines)
+
+
+def _percentiles(values, scale=1000.0):
+    if not values:
+        return "n/a"
+    p50, p95, p99, top = np.percentile(np.asarray(values) * scale, [50, 95, 99, 100])
+    return f"p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f}  max {top:.2f} ms"
+
+
+def report(recorder, elapsed, dropped, decoder):
+    feeder = recorder.feeder
+    print("📊 Serial replay results")
+    print(f"   Sent {feeder.sent} frames in {elapsed:.1f} s ({feeder.sent / elapsed:,.0f} frames/s), "
+          f"displayed {recorder.received}")
+    print(f"   Dropped (queue full): {dropped} | Lost (seq gaps): {decoder.frames_lost} | "
+          f"Malformed: {decoder.malformed} | Not displayed: {max(feeder.sent - recorder.received, 0)}")
+    print(f"   Wire-to-display latency: {_percentiles(recorder.latencies)}")
+    print(f"   Batch processing time:   {_percentiles(recorder.batch_times)}")
+    if recorder.loop_lag:
+        print(f"   Event-loop lag:          {_percentiles(recorder.loop_lag)}")
+    if recorder.memory_start is not None:
+        growth = (recorder.memory_end - recorder.memory_start) / 1e6
+        print(f"   Python heap: {recorder.memory_start / 1e6:.1f} MB -> "
+              f"{recorder.memory_end / 1e6:.1f} MB ({growth:+.1f} MB)")
+
+
+# ========== Targets ==========
+def run_headless(feeder, db_path):
+    """
+    The dashboard's ingestion path without Tk: reader thread + FrameDecoder,
+    bounded queue, then ring buffer and telemetry store in batches.
+    """
+    import serial
+    from ring_buffer import SensorRingBuffer
+    from telemetry_store import TelemetryStore
+    from dataLogger import SERIAL_QUEUE_SIZE, INGEST_INTERVAL_MS, MAX_FRAMES_PER_DRAIN, HISTORY_CAPACITY
+
+    recorder = Recorder(feeder)
+    frames = queue.Queue(maxsize=SERIAL_QUEUE_SIZE)
+    decoder = FrameDecoder()
+    history = SensorRingBuffer(capacity=HISTORY_CAPACITY)
+    store = TelemetryStore(db_path)
+    connection = serial.Serial(feeder.device, baudrate=115200, timeout=0.2)
+    dropped = 0
+    reading = True
+
+    def reader():
+        nonlocal dropped
+        while reading:
+            raw = connection.read(connection.in_waiting or 1)
+            for line, updates in decoder.feed(raw):
+                while True:
+                    try:
+                        frames.put_nowait((datetime.now(), line, updates))
+                        break
+                    except queue.Full:
+                        try:
+                            frames.get_nowait()
+                            dropped += 1
+                        except queue.Empty:
+                            pass
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    feeder.start()
+    start = time.perf_counter()
+    while feeder.is_alive() or not frames.empty():
+        time.sleep(INGEST_INTERVAL_MS / 1000.0)
+        batch = []
+        try:
+            while len(batch) < MAX_FRAMES_PER_DRAIN:
+                batch.append(frames.get_nowait())
+        except queue.Empty:
+            pass
+        if not batch:
+            continue
+        t0 = time.perf_counter()
+        for timestamp, line, updates in batch:
+            if updates:
+                sample = {key: updates.get(key) for key in history.fields}
+                history.append(timestamp, **sample)
+                store.add(timestamp, **sample)
+        recorder.batch_times.append(time.perf_counter() - t0)
+        recorder.frames_done([line for _, line, _ in batch])
+    elapsed = time.perf_counter() - start
+    reading = False
+    thread.join(1)
+    connection.close()
+    store.close()
+    return recorder, elapsed, dropped, decoder
+
+
+def run_gui(feeder, db_path):
+    """
+    Drives the real dashboard: connects it to the pty and times every
+    process_serial_batch call, which ends with the gauges updated.
+    """
+    from dataLogger import VegetationAnalysisGUI
+    from telemetry_store import TelemetryStore
+
+    recorder = Recorder(feeder)
+    app = VegetationAnalysisGUI()
+    app.telemetry_store.close()
+    app.telemetry_store = TelemetryStore(db_path)  # Keep benchmark samples out of telemetry.db
+
+    process_batch = app.process_serial_batch
+
+    def timed_batch(frames):
+        t0 = time.perf_counter()
+        process_batch(frames)
+        app.update_idletasks()  # Include the redraw of the updated widgets
+        recorder.batch_times.append(time.perf_counter() - t0)
+        recorder.frames_done([line for _, line, _ in frames])
+
+    app.process_serial_batch = timed_batch
+
+    last_beat = [time.perf_counter()]
+
+    def heartbeat():
+        now = time.perf_counter()
+        recorder.loop_lag.append(max(now - last_beat[0] - HEARTBEAT_MS / 1000.0, 0.0))
+        last_beat[0] = now
+        if app.running:
+            app.after(HEARTBEAT_MS, heartbeat)
+
+    def finish():
+        if feeder.is_alive() or not app.serial_queue.empty():
+            app.after(200, finish)
+            return
+        app.on_closing()
+
+    app.port_combobox.set(feeder.device)
+    app.connect_serial()
+    feeder.start()
+    start = time.perf_counter()
+    app.after(HEARTBEAT_MS, heartbeat)
+    app.after(200, finish)
+    app.mainloop()
+    elapsed = time.perf_counter() - start
+    return recorder, elapsed, app.frames_dropped, app.frame_decoder
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay or synthesize telemetry into a pty and measure ingestion")
+    parser.add_argument("--replay", help="Recorded log to replay (looped); default is synthetic frames")
+    parser.add_argument("--binary", action="store_true", help="Synthetic binary frames instead of ASCII")
+    parser.add_argument("--rate", type=float, default=100.0, help="Frames per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to feed frames")
+    parser.add_argument("--headless", action="store_true",
+                        help="Benchmark decoding and storage only (no Tk display needed)")
+    args = parser.parse_args()
+
+    if not hasattr(os, "openpty"):
+        sys.exit("❌ serial_replay.py needs a POSIX pty")
+    source = recorded_frames(args.replay) if args.replay else synthetic_frames(args.binary)
+    feeder = PtyFeeder(source, args.rate, args.duration)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tracemalloc.start()
+        target = run_headless if args.headless else run_gui
+        try:
+            result = target(feeder, os.path.join(tmp, "replay.db"))
+        finally:
+            feeder.close()
+            tracemalloc.stop()
+    report(*result)
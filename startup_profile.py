@@ -0,0 +1,87 @@
+"""
+Startup-time profile of the dashboard.
+
+Runs `python -X importtime -c "import dataLogger"` in fresh interpreters and
+prints the total import time plus the slowest modules, so regressions
+(a heavy import creeping back into startup) show up as numbers:
+
+    python startup_profile.py                  # import breakdown, best of 3 runs
+    python startup_profile.py --budget-ms 400  # exit code 1 if over budget (CI)
+    python startup_profile.py --window         # also time building the window (needs a display)
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+# Child interpreters run here so the dashboard modules (and its relative data paths) resolve
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def profile_imports(module="dataLogger", runs=3):
+    """
+    Best-of-`runs` import profile. Returns (total_us, [(module, self_us, cumulative_us, depth)]).
+    """
+    best = None
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                capture_output=True, text=True, cwd=REPO_DIR)
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+        rows = []
+        for line in result.stderr.splitlines():
+            match = _LINE_RE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+        total = next(cumulative for name, _, cumulative, _ in rows if name == module)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    return best
+
+
+def time_window():
+    """
+    Seconds from importing dataLogger to the first fully drawn window.
+    """
+    code = ("import time; t0 = time.perf_counter(); import dataLogger; t1 = time.perf_counter(); "
+            "app = dataLogger.VegetationAnalysisGUI(); app.update(); t2 = time.perf_counter(); "
+            "app.on_closing(); print(t1 - t0, t2 - t1)")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=REPO_DIR)
+    if result.returncode != 0:
+        raise RuntimeError(f"Window startup failed:\n{result.stderr[-2000:]}")
+    import_s, window_s = map(float, result.stdout.split()[-2:])
+    return import_s, window_s
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile dashboard startup time")
+    parser.add_argument("--module", default="dataLogger")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to run (best is reported)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Fail (exit code 1) if the import takes longer than this")
+    parser.add_argument("--window", action="store_true", help="Also time building the main window")
+    args = parser.parse_args()
+
+    total, rows = profile_imports(args.module, args.runs)
+    print(f"📊 import {args.module}: {total / 1000:.1f} ms (best of {args.runs})")
+
+    # Top-level packages (depth 1 below the profiled module) by cumulative time
+    print("\n   Cumulative ms  Direct imports")
+    for name, _, cumulative, _ in sorted((r for r in rows if r[3] == 1), key=lambda r: -r[2])[:args.top]:
+        print(f"   {cumulative / 1000:13.1f}  {name}")
+
+    print("\n   Self ms  Slowest individual modules")
+    for name, self_us, _, _ in sorted(rows, key=lambda r: -r[1])[:args.top]:
+        print(f"   {self_us / 1000:7.1f}  {name}")
+
+    if args.window:
+        import_s, window_s = time_window()
+        print(f"\n📊 Window: import {import_s * 1000:.0f} ms + build and first draw {window_s * 1000:.0f} ms")
+
+    if args.budget_ms is not None and total / 1000 > args.budget_ms:
+        print(f"\n❌ Startup import over budget: {total / 1000:.1f} ms > {args.budget_ms:.0f} ms")
+        sys.exit(1)
@@ -0,0 +1,302 @@
+"""
+Parsing of the STM32 key=value telemetry lines, e.g.
+
+    temperature=25.0; humidity=60.0; moisture=35.2; light=80.1;temp_status=1 ;moisture_status=0; light_status=1;weather=No_rain; Motor=ON
+
+(see HAL_TIM_PeriodElapsedCallback in main.c). Kept free of any GUI code so
+the serial reader thread can parse before handing frames to the UI.
+
+The firmware always prints the same fields in the same order, so the fast
+path splits a frame on ';' and '=' at fixed positions and only checks that
+the keys are the expected ones. Frames that deviate (older firmware,
+reordered or partial lines, other capitalisation) fall back to a key=value
+tokenizer. Run this module to benchmark the parser:
+
+    python telemetry.py [frames]
+
+Firmware built with TELEMETRY_BINARY sends fixed 24-byte little-endian
+frames instead (see send_binary_frame in main.c):
+
+    offset  0  sync      0xAA 0x55
+            2  seq       uint16, wraps at 65536
+            4  temperature, humidity, moisture, light   float32 each
+           20  flags     bit0 temp_ok, bit1 moisture_ok, bit2 light_ok, bit3 motor on
+           21  weather   index into WEATHER_CODES
+           22  crc       CRC-16/CCITT-FALSE of bytes 2..21
+
+FrameDecoder accepts either format on the same stream, so older ASCII
+firmware keeps working, and counts frames lost from sequence gaps.
+"""
+import re
+import struct
+from binascii import crc_hqx
+import numpy as np
+
+NUMERIC_KEYS = ("temperature", "humidity", "moisture", "light")
+STATUS_KEYS = ("temp_status", "moisture_status", "light_status")
+
+WEATHER_LABELS = {
+    "Rain_now_tomorrow": "🌧️ Raining Now.\n 🌧️ Rain expected tomorrow",
+    "Rain_now": "🌧️ Raining Now",
+    "Rain_tomorrow": "🌧️ Rain expected tomorrow",
+    "No_rain": "☀️ Sunny / No Rain",
+}
+UNKNOWN_WEATHER = "🌤️ Unknown"
+STATUS_LABELS = {"1": "✅", "0": "❌"}
+
+# Binary frame layout
+FRAME_SYNC = b"\xaa\x55"
+FRAME_DTYPE = np.dtype([
+    ("sync", "<u2"), ("seq", "<u2"),
+    ("temperature", "<f4"), ("humidity", "<f4"), ("moisture", "<f4"), ("light", "<f4"),
+    ("flags", "u1"), ("weather", "u1"), ("crc", "<u2"),
+])
+FRAME_SIZE = FRAME_DTYPE.itemsize
+_FRAME_STRUCT = struct.Struct("<2sH4fBB")
+WEATHER_CODES = ("unknown", "No_rain", "Rain_now", "Rain_tomorrow", "Rain_now_tomorrow")
+FLAG_TEMP_OK, FLAG_MOISTURE_OK, FLAG_LIGHT_OK, FLAG_MOTOR_ON = 1, 2, 4, 8
+MAX_LINE_LENGTH = 1024  # Longer runs of bytes without a newline or sync word are discarded
+
+# Keys of a firmware frame in the order it prints them
+_FRAME_KEYS = NUMERIC_KEYS + STATUS_KEYS + ("weather", "Motor")
+_FIELD_RE = re.compile(r"([^;=\s]+)\s*=\s*([^;]*)")
+
+
+class MalformedFrame(ValueError):
+    """
+    Raised for a line that is not a usable telemetry frame.
+    `line` is the offending text and `reason` a short description.
+    """
+
+    def __init__(self, reason, line):
+        super().__init__(f"{reason} in {line!r}")
+        self.reason = reason
+        self.line = line
+
+
+def weather_label(value):
+    return WEATHER_LABELS.get(value.strip(), UNKNOWN_WEATHER)
+
+
+def parse_frame(line):
+    """
+    Parses one telemetry line into a dict of sensor_data updates: floats for
+    the numeric keys, ✅/❌ for the status keys and display labels for weather.
+    Raises MalformedFrame if a value is invalid or no known key could be parsed.
+    """
+    parts = line.split(";")
+    if len(parts) >= 9 and line.count("=") == 9:
+        try:
+            t, h, m, l, ts, ms, ls, weather, motor = [part.split("=") for part in parts[:9]]
+            # Keys in firmware order (the first may carry format_frame's "#<seq> " tag)
+            if (t[0].rpartition(" ")[2].lstrip(), h[0].strip(), m[0].strip(), l[0].strip(),
+                    ts[0].strip(), ms[0].strip(), ls[0].strip(), weather[0].strip(),
+                    motor[0].strip()) == _FRAME_KEYS and not "".join(parts[9:]).strip():
+                motor = motor[1].strip()
+                if motor:
+                    return {
+                        "temperature": float(t[1]),
+                        "humidity": float(h[1]),
+                        "moisture": float(m[1]),
+                        "light": float(l[1]),
+                        "temp_status": STATUS_LABELS[ts[1].strip()],
+                        "moisture_status": STATUS_LABELS[ms[1].strip()],
+                        "light_status": STATUS_LABELS[ls[1].strip()],
+                        "weather": WEATHER_LABELS.get(weather[1].strip(), UNKNOWN_WEATHER),
+                        "motor": motor,
+                    }
+        except (ValueError, IndexError, KeyError):
+            pass  # Not the fixed layout; the tokenizer reports what is wrong
+    return _parse_fields(line)
+
+
+def _parse_fields(line):
+    # Slow path: any subset of the keys, in any order
+    updates = {}
+    for key, value in _FIELD_RE.findall(line):
+        key = key.lower()
+        value = value.strip()
+        if key in NUMERIC_KEYS:
+            try:
+                updates[key] = float(value)
+            except ValueError:
+                raise MalformedFrame(f"Invalid {key} value {value!r}", line) from None
+        elif key in STATUS_KEYS:
+            if value not in STATUS_LABELS:
+                raise MalformedFrame(f"Invalid {key} value {value!r}", line)
+            updates[key] = STATUS_LABELS[value]
+        elif key == "motor":
+            updates[key] = value
+        elif key == "weather":
+            updates[key] = weather_label(value)
+
+    if not updates:
+        raise MalformedFrame("No telemetry fields", line)
+    return updates
+
+
+# ========== Binary frames ==========
+def frame_crc(payload):
+    return crc_hqx(payload, 0xFFFF)
+
+
+def encode_frame(seq, temperature, humidity, moisture, light, flags=0, weather="unknown"):
+    """
+    Builds one binary frame exactly as the firmware does (for replay and testing).
+    """
+    code = WEATHER_CODES.index(weather) if weather in WEATHER_CODES else 0
+    body = _FRAME_STRUCT.pack(FRAME_SYNC, seq & 0xFFFF, temperature, humidity, moisture, light,
+                              flags, code)
+    return body + struct.pack("<H", frame_crc(body[2:]))
+
+
+def decode_frames(data):
+    """
+    Zero-copy view of a buffer holding back-to-back binary frames as a
+    FRAME_DTYPE record array. Does not check sync words or CRCs.
+    """
+    return np.frombuffer(data, dtype=FRAME_DTYPE, count=len(data) // FRAME_SIZE)
+
+
+def frame_updates(record):
+    """
+    sensor_data updates for one decoded binary frame (same shape as parse_frame).
+    """
+    flags = int(record["flags"])
+    code = int(record["weather"])
+    return {
+        "temperature": float(record["temperature"]),
+        "humidity": float(record["humidity"]),
+        "moisture": float(record["moisture"]),
+        "light": float(record["light"]),
+        "temp_status": "✅" if flags & FLAG_TEMP_OK else "❌",
+        "moisture_status": "✅" if flags & FLAG_MOISTURE_OK else "❌",
+        "light_status": "✅" if flags & FLAG_LIGHT_OK else "❌",
+        "weather": weather_label(WEATHER_CODES[code]) if code < len(WEATHER_CODES) else UNKNOWN_WEATHER,
+        "motor": "ON" if flags & FLAG_MOTOR_ON else "OFF",
+    }
+
+
+def format_frame(record):
+    """
+    The ASCII line the firmware would have sent for a binary frame (for logs and the raw view).
+    """
+    flags = int(record["flags"])
+    code = int(record["weather"])
+    weather = WEATHER_CODES[code] if code < len(WEATHER_CODES) else "unknown"
+    return (f"#{int(record['seq'])} temperature={record['temperature']:.1f}; "
+            f"humidity={record['humidity']:.1f}; moisture={record['moisture']:.1f}; "
+            f"light={record['light']:.1f};temp_status={flags & 1} ;"
+            f"moisture_status={(flags >> 1) & 1}; light_status={(flags >> 2) & 1};"
+            f"weather={weather}; Motor={'ON' if flags & FLAG_MOTOR_ON else 'OFF'}")
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for a serial byte stream carrying ASCII lines, binary
+    frames, or both. feed() returns a list of (line, updates) pairs, where
+    updates is None for a malformed ASCII line (it is still returned for
+    display). Binary frames with a bad CRC are skipped.
+
+    Counters: frames, malformed, frames_lost (from sequence gaps) and
+    last_error (reason for the most recent malformed input).
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._last_seq = None
+        self.frames = 0
+        self.malformed = 0
+        self.frames_lost = 0
+        self.last_error = ""
+
+    def _reject(self, reason):
+        self.malformed += 1
+        self.last_error = reason
+
+    def feed(self, data):
+        buf = self._buffer
+        buf += data
+        out = []
+        while buf:
+            sync = buf.find(FRAME_SYNC)
+            newline = buf.find(b"\n")
+            if sync == 0:
+                if len(buf) < FRAME_SIZE:
+                    break
+                count = self._take_binary(buf, out)
+                if count == 0:
+                    self._reject("Binary frame CRC mismatch")
+                    del buf[:1]  # Resynchronise on the next sync word
+                continue
+            if newline != -1 and (sync == -1 or newline < sync):
+                self._take_line(bytes(buf[:newline]), out)
+                del buf[:newline + 1]
+                continue
+            if sync > 0:
+                self._take_line(bytes(buf[:sync]), out)  # Unterminated text before a binary frame
+                del buf[:sync]
+                continue
+            if len(buf) > MAX_LINE_LENGTH:
+                self._reject("Line too long")
+                buf.clear()
+            break
+        return out
+
+    def _take_binary(self, buf, out):
+        # Decode the longest run of consecutive valid frames at the start of buf in one go
+        chunk = bytes(buf[:len(buf) - len(buf) % FRAME_SIZE])
+        records = decode_frames(chunk)
+        count = 0
+        for i, record in enumerate(records):
+            start = i * FRAME_SIZE
+            if chunk[start:start + 2] != FRAME_SYNC or \
+                    frame_crc(chunk[start + 2:start + FRAME_SIZE - 2]) != int(record["crc"]):
+                break
+            self._track_sequence(int(record["seq"]))
+            out.append((format_frame(record), frame_updates(record)))
+            count += 1
+        del buf[:count * FRAME_SIZE]
+        self.frames += count
+        return count
+
+    def _track_sequence(self, seq):
+        if self._last_seq is not None:
+            self.frames_lost += (seq - self._last_seq - 1) & 0xFFFF
+        self._last_seq = seq
+
+    def _take_line(self, raw, out):
+        try:
+            line = raw.decode("utf-8").strip(" \t\r\n;")
+        except UnicodeDecodeError:
+            self._reject("Not UTF-8 text")
+            return
+        if not line:
+            return
+        self.frames += 1
+        try:
+            updates = parse_frame(line)
+        except MalformedFrame as e:
+            self._reject(e.reason)
+            updates = None
+        out.append((line, updates))
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    weathers = list(WEATHER_LABELS)
+    lines = [
+        f"temperature={20 + i % 10:.1f}; humidity={50 + i % 30:.1f}; moisture={30 + i % 40:.1f}; "
+        f"light={i % 100:.1f};temp_status={i % 2} ;moisture_status={(i // 2) % 2}; "
+        f"light_status=1;weather={weathers[i % len(weathers)]}; Motor={'ON' if i % 3 else 'OFF'}"
+        for i in range(1000)
+    ]
+    print(f"📊 Parsing {count} frames...")
+    start = time.perf_counter()
+    for i in range(count):
+        parse_frame(lines[i % 1000])
+    elapsed = time.perf_counter() - start
+    print(f"✅ {count / elapsed:,.0f} frames/s ({elapsed / count * 1e6:.2f} µs per frame)")
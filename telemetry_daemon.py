@@ -0,0 +1,178 @@
+"""
+Headless telemetry collector.
+
+Reads one or more field-node serial ports under asyncio, decodes frames
+with telemetry.FrameDecoder (ASCII or binary firmware), stores every sample
+durably in a per-node TelemetryStore and re-publishes the frames as ASCII
+lines on a local TCP port per node, so the dashboard can subscribe while the
+daemon keeps logging with no GUI open:
+
+    python telemetry_daemon.py --port north=/dev/ttyACM0 --port south=/dev/ttyACM1
+    # node i is served on 127.0.0.1:<listen-port + i>; in the GUI connect to
+    # socket://127.0.0.1:7878
+
+Samples are committed in batches every --flush-interval seconds with
+synchronous=FULL, i.e. one fsync per batch rather than per frame. Any path
+pyserial can open works as a port, including the slave side of a pty
+(see serial_replay.py) or a loop:// URL.
+"""
+import os
+import asyncio
+import argparse
+from datetime import datetime
+import serial
+from telemetry import FrameDecoder, NUMERIC_KEYS
+from telemetry_store import TelemetryStore
+
+DEFAULT_LISTEN_PORT = 7878
+DEFAULT_FLUSH_INTERVAL = 2.0
+CLIENT_QUEUE_SIZE = 1000   # Lines buffered per subscriber before the oldest are dropped
+READ_TIMEOUT = 0.5
+
+
+class NodeCollector:
+    """
+    One serial port: reads, decodes, stores and fans lines out to TCP subscribers.
+    """
+
+    def __init__(self, name, device, db_path, baudrate=115200):
+        self.name = name
+        self.device = device
+        self.baudrate = baudrate
+        self.decoder = FrameDecoder()
+        # Flushing is driven by the daemon's timer and runs in the executor; add() on the
+        # event loop never waits for those fsyncs (TelemetryStore keeps separate locks)
+        self.store = TelemetryStore(db_path, batch_size=float("inf"),
+                                    flush_interval=float("inf"), durable=True)
+        self.subscribers = set()
+        self.samples = 0
+
+    def open(self):
+        return serial.serial_for_url(self.device, baudrate=self.baudrate, timeout=READ_TIMEOUT)
+
+    async def run(self, stop):
+        loop = asyncio.get_running_loop()
+        while not stop.is_set():
+            try:
+                connection = await loop.run_in_executor(None, self.open)
+            except serial.SerialException as e:
+                print(f"⚠️ {self.name}: cannot open {self.device} ({e}), retrying")
+                await asyncio.sleep(2)
+                continue
+
+            print(f"✅ {self.name}: reading {self.device}")
+            try:
+                while not stop.is_set():
+                    raw = await loop.run_in_executor(
+                        None, lambda: connection.read(connection.in_waiting or 1))
+                    if raw:
+                        self.handle(raw)
+            except (serial.SerialException, OSError) as e:
+                print(f"⚠️ {self.name}: {self.device} disconnected ({e})")
+            finally:
+                connection.close()
+
+    def handle(self, raw):
+        timestamp = datetime.now()
+        for line, updates in self.decoder.feed(raw):
+            if updates is not None and any(key in updates for key in NUMERIC_KEYS):
+                self.store.add(timestamp, **{key: updates.get(key) for key in NUMERIC_KEYS})
+                self.samples += 1
+            self.publish(line)
+
+    def publish(self, line):
+        data = (line + "\n").encode("utf-8")
+        for client in self.subscribers:
+            if client.full():
+                client.get_nowait()  # Slow subscriber: drop its oldest line
+            client.put_nowait(data)
+
+    async def serve_client(self, reader, writer):
+        client = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.subscribers.add(client)
+        peer = writer.get_extra_info("peername")
+        print(f"📊 {self.name}: subscriber {peer} connected")
+        try:
+            while True:
+                writer.write(await client.get())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.subscribers.discard(client)
+            writer.close()
+            print(f"📊 {self.name}: subscriber {peer} disconnected")
+
+    def close(self):
+        self.store.close()
+
+
+async def flush_periodically(collectors, interval, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        for collector in collectors:
+            await loop.run_in_executor(None, collector.store.flush)
+
+
+async def run_daemon(ports, db_dir=".", host="127.0.0.1", listen_port=DEFAULT_LISTEN_PORT,
+                     flush_interval=DEFAULT_FLUSH_INTERVAL, baudrate=115200, stop=None):
+    """
+    ports: list of (name, device). Runs until `stop` (an asyncio.Event) is set.
+    """
+    stop = stop or asyncio.Event()
+    os.makedirs(db_dir, exist_ok=True)
+    collectors = [NodeCollector(name, device, os.path.join(db_dir, f"telemetry_{name}.db"), baudrate)
+                  for name, device in ports]
+    servers = []
+    try:
+        for i, collector in enumerate(collectors):
+            server = await asyncio.start_server(collector.serve_client, host, listen_port + i)
+            servers.append(server)
+            print(f"✅ {collector.name}: serving socket://{host}:{listen_port + i}")
+
+        tasks = [asyncio.create_task(collector.run(stop)) for collector in collectors]
+        tasks.append(asyncio.create_task(flush_periodically(collectors, flush_interval, stop)))
+        await stop.wait()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        for server in servers:
+            server.close()
+        for collector in collectors:
+            collector.close()
+            print(f"📊 {collector.name}: {collector.samples} samples, "
+                  f"{collector.decoder.frames_lost} lost, {collector.decoder.malformed} malformed")
+    return collectors
+
+
+def parse_port(spec):
+    # "name=device", or just "device" (named after its basename)
+    if "=" in spec:
+        name, device = spec.split("=", 1)
+    else:
+        device = spec
+        name = os.path.basename(device.rstrip("/")) or "node"
+    return name, device
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless telemetry logger for the field nodes")
+    parser.add_argument("--port", action="append", required=True, type=parse_port,
+                        help="Serial port as NAME=DEVICE or DEVICE (repeat for several nodes)")
+    parser.add_argument("--db-dir", default=".", help="Folder for the per-node telemetry_<name>.db files")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--listen-port", type=int, default=DEFAULT_LISTEN_PORT,
+                        help="TCP port for the first node; further nodes use the following ports")
+    parser.add_argument("--flush-interval", type=float, default=DEFAULT_FLUSH_INTERVAL,
+                        help="Seconds between batched, fsynced commits")
+    parser.add_argument("--baudrate", type=int, default=115200)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_daemon(args.port, args.db_dir, args.host, args.listen_port,
+                               args.flush_interval, args.baudrate))
+    except KeyboardInterrupt:
+        print("✅ Collector stopped")
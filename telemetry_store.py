@@ -0,0 +1,197 @@
+"""
+Persistent SQLite store for sensor telemetry.
+
+Raw samples go into `samples`. Each write batch also folds into min/max/sum/count
+rollups at 1 min, 1 h and 1 day buckets (rollup_60, rollup_3600, rollup_86400),
+so a range query reads at most a few hundred pre-aggregated rows at the
+coarsest resolution that still fits the requested number of points, however
+many months are stored.
+Timestamps are seconds as produced by ring_buffer.to_epoch_seconds.
+"""
+import os
+import time
+import sqlite3
+import threading
+import numpy as np
+from ring_buffer import SENSOR_FIELDS, to_epoch_seconds
+
+ROLLUP_RESOLUTIONS = (60, 3600, 86400)
+DEFAULT_MAX_POINTS = 1000
+
+
+def _rollup_columns(fields):
+    columns = []
+    for field in fields:
+        columns += [f"{field}_min", f"{field}_max", f"{field}_sum", f"{field}_n"]
+    return columns
+
+
+class TelemetryStore:
+    def __init__(self, db_path='telemetry.db', fields=SENSOR_FIELDS,
+                 batch_size=200, flush_interval=5.0, durable=False):
+        """
+        Rows passed to add() are buffered and written in one transaction once
+        batch_size rows are pending or flush_interval seconds have passed.
+        durable=True runs SQLite with synchronous=FULL, so every committed
+        batch is fsynced before flush() returns.
+        A due batch is flushed inline by add() (and query()/latest() flush
+        first), commit and fsync included. Callers that must not block pass
+        batch_size=float("inf"), flush_interval=float("inf") and call flush()
+        from another thread, as telemetry_daemon does; add() then only waits
+        for the short buffer lock, never for a commit running in flush().
+        """
+        self.db_path = db_path
+        self.fields = tuple(fields)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()     # Guards _pending / _last_flush only
+        self._db_lock = threading.Lock()  # Serialises use of the connection
+
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if durable else 'NORMAL'}")
+        self._create_schema()
+
+    def _create_schema(self):
+        field_defs = ", ".join(f"{field} REAL" for field in self.fields)
+        rollup_defs = ", ".join(f"{column} REAL" for column in _rollup_columns(self.fields))
+        with self._conn:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS samples (ts REAL NOT NULL, {field_defs})")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS samples_ts ON samples (ts)")
+            for resolution in ROLLUP_RESOLUTIONS:
+                self._conn.execute(f"CREATE TABLE IF NOT EXISTS rollup_{resolution} "
+                                   f"(bucket INTEGER PRIMARY KEY, {rollup_defs})")
+
+    # ========== Writes ==========
+    def add(self, timestamp, **values):
+        with self._lock:
+            self._pending.append((to_epoch_seconds(timestamp),) +
+                                 tuple(values.get(field) for field in self.fields))
+            due = (len(self._pending) >= self.batch_size or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def add_many(self, rows):
+        """
+        rows: iterable of dicts with a 'timestamp' key plus field values.
+        """
+        for row in rows:
+            row = dict(row)
+            self.add(row.pop("timestamp"), **row)
+
+    def flush(self):
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not rows:
+            return 0
+        # Insert, rollups, commit and fsync happen without the buffer lock held
+        with self._db_lock:
+            with self._conn:
+                placeholders = ", ".join("?" * (len(self.fields) + 1))
+                self._conn.executemany(
+                    f"INSERT INTO samples (ts, {', '.join(self.fields)}) VALUES ({placeholders})", rows)
+                for resolution in ROLLUP_RESOLUTIONS:
+                    self._merge_rollup(resolution, rows)
+        return len(rows)
+
+    def _merge_rollup(self, resolution, rows):
+        # Aggregate the batch per bucket in NumPy, then upsert into the rollup table
+        data = np.array([[np.nan if v is None else v for v in row] for row in rows], dtype=np.float64)
+        buckets = np.floor(data[:, 0] / resolution).astype(np.int64)
+        unique, inverse = np.unique(buckets, return_inverse=True)
+
+        columns = _rollup_columns(self.fields)
+        records = []
+        for k, bucket in enumerate(unique):
+            chunk = data[inverse == k, 1:]
+            record = [int(bucket)]
+            for f in range(len(self.fields)):
+                col = chunk[:, f]
+                col = col[~np.isnan(col)]
+                if len(col):
+                    record += [float(col.min()), float(col.max()), float(col.sum()), len(col)]
+                else:
+                    record += [None, None, 0.0, 0]
+            records.append(record)
+
+        updates = []
+        for field in self.fields:
+            updates += [
+                f"{field}_min = coalesce(min({field}_min, excluded.{field}_min), {field}_min, excluded.{field}_min)",
+                f"{field}_max = coalesce(max({field}_max, excluded.{field}_max), {field}_max, excluded.{field}_max)",
+                f"{field}_sum = {field}_sum + excluded.{field}_sum",
+                f"{field}_n = {field}_n + excluded.{field}_n",
+            ]
+        placeholders = ", ".join("?" * (len(columns) + 1))
+        self._conn.executemany(
+            f"INSERT INTO rollup_{resolution} (bucket, {', '.join(columns)}) VALUES ({placeholders}) "
+            f"ON CONFLICT(bucket) DO UPDATE SET {', '.join(updates)}", records)
+
+    # ========== Reads ==========
+    def latest(self, count):
+        """
+        The newest `count` raw samples, oldest first, as (timestamps, {field: values}).
+        """
+        self.flush()
+        with self._db_lock:
+            rows = self._conn.execute(
+                f"SELECT ts, {', '.join(self.fields)} FROM samples ORDER BY ts DESC LIMIT ?",
+                (count,)).fetchall()
+        return self._raw_result(rows[::-1])
+
+    def _raw_result(self, rows):
+        data = np.array(rows, dtype=np.float64).reshape(len(rows), len(self.fields) + 1)
+        return data[:, 0], {field: data[:, i + 1] for i, field in enumerate(self.fields)}
+
+    def query(self, start_time, end_time, max_points=DEFAULT_MAX_POINTS):
+        """
+        Samples between start_time and end_time at the finest resolution that
+        yields at most max_points rows.
+        Returns (timestamps, values, resolution), where resolution is 0 for raw
+        samples or the bucket size in seconds, and values maps each field to its
+        mean plus '<field>_min' / '<field>_max' arrays.
+        """
+        self.flush()
+        start, end = to_epoch_seconds(start_time), to_epoch_seconds(end_time)
+        with self._db_lock:
+            rows = self._conn.execute(
+                f"SELECT ts, {', '.join(self.fields)} FROM samples WHERE ts BETWEEN ? AND ? "
+                f"ORDER BY ts LIMIT ?", (start, end, max_points + 1)).fetchall()
+            if len(rows) <= max_points:
+                timestamps, values = self._raw_result(rows)
+                for field in self.fields:
+                    values[f"{field}_min"] = values[f"{field}_max"] = values[field]
+                return timestamps, values, 0
+
+            span = end - start
+            resolution = next((r for r in ROLLUP_RESOLUTIONS if span / r <= max_points),
+                              ROLLUP_RESOLUTIONS[-1])
+            columns = _rollup_columns(self.fields)
+            rows = self._conn.execute(
+                f"SELECT bucket, {', '.join(columns)} FROM rollup_{resolution} "
+                f"WHERE bucket BETWEEN ? AND ? ORDER BY bucket",
+                (int(start // resolution), int(end // resolution))).fetchall()
+
+        data = np.array(rows, dtype=np.float64).reshape(len(rows), len(columns) + 1)
+        # Bucket centre as the sample time
+        timestamps = data[:, 0] * resolution + resolution / 2
+        values = {}
+        for i, field in enumerate(self.fields):
+            base = 1 + 4 * i
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values[field] = data[:, base + 2] / data[:, base + 3]
+            values[f"{field}_min"] = data[:, base]
+            values[f"{field}_max"] = data[:, base + 1]
+        return timestamps, values, resolution
+
+    def close(self):
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
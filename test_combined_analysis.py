@@ -0,0 +1,43 @@
+"""
+Runs Combined_Analysis_NDVI_NIR on small synthetic images and checks that
+re-thresholding a figure does not leak into later cache hits.
+Run with: python -m pytest -q test_combined_analysis.py
+"""
+import numpy as np
+from PIL import Image
+from result_cache import ResultCache
+from histogram_stats import percent_at_or_above
+from Combined_Analysis_NDVI_NIR import combined_ndvi_vari_analysis, apply_thresholds, combined_mask_for
+
+
+def _images(tmp_path):
+    rng = np.random.default_rng(0)
+    rgb_path, nir_path = str(tmp_path / "rgb.png"), str(tmp_path / "nir.png")
+    Image.fromarray(rng.integers(0, 256, (64, 96, 3), dtype=np.uint8)).save(rgb_path)
+    Image.fromarray(rng.integers(0, 256, (64, 96), dtype=np.uint8)).save(nir_path)
+    return rgb_path, nir_path
+
+
+def test_cache_hit_restores_the_thresholds_of_the_run(tmp_path):
+    rgb_path, nir_path = _images(tmp_path)
+    cache = ResultCache(cache_dir=str(tmp_path / "cache"))
+    kwargs = dict(ndvi_folder=str(tmp_path / "ndvi"), vari_folder=str(tmp_path / "vari"),
+                  save_outputs=False, cache=cache)
+
+    fig, results = combined_ndvi_vari_analysis(rgb_path, nir_path, **kwargs)
+    apply_thresholds(fig, results, 0.9, 0.05)  # As the GUI sliders do
+    fig2, results2 = combined_ndvi_vari_analysis(rgb_path, nir_path, **kwargs)
+
+    assert fig2 is fig  # Served from the memory tier
+    nt, vt = results2['ndvi_threshold'], results2['vari_threshold']
+    combined_view = fig2.viewports[1]
+    assert combined_view.levels.thresholds == (nt, vt)
+    expected = combined_mask_for(results2['ndvi'], results2['vari'], nt, vt)
+    np.testing.assert_array_equal(combined_view.levels[0], expected)
+
+    ndvi_line, vari_line = fig2.histogram_ax.threshold_lines
+    assert list(ndvi_line.get_xdata()) == [nt, nt]
+    assert list(vari_line.get_xdata()) == [vt, vt]
+    labels = [text.get_text() for text in fig2.histogram_ax.get_legend().get_texts()]
+    assert f"NDVI Threshold ({percent_at_or_above(results2['ndvi_hist'], nt):.0f}% above)" in labels
+    assert f"VARI Threshold ({percent_at_or_above(results2['vari_hist'], vt):.0f}% above)" in labels
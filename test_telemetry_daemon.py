@@ -0,0 +1,70 @@
+"""
+Drives telemetry_daemon.NodeCollector through a pyserial loop:// port and
+checks what it stores. Run with: python -m pytest -q test_telemetry_daemon.py
+"""
+import asyncio
+import sqlite3
+import threading
+import serial
+from datetime import datetime
+from telemetry import encode_frame
+from telemetry_daemon import NodeCollector
+from telemetry_store import TelemetryStore, ROLLUP_RESOLUTIONS
+
+N_FRAMES = 50
+
+
+def _frames():
+    # (temperature, humidity, moisture, light) chosen to be exact in float32
+    readings = [(20 + i * 0.5, 50 + i, 30 + i * 0.25, 10 + 2 * i) for i in range(N_FRAMES)]
+    data = b"".join(encode_frame(i, *values) for i, values in enumerate(readings))
+    return readings, data
+
+
+async def _collect(collector, port, expected):
+    stop = asyncio.Event()
+    collector.open = lambda: port  # loop:// reads back what was written to it
+    task = asyncio.create_task(collector.run(stop))
+    for _ in range(200):
+        if collector.samples >= expected:
+            break
+        await asyncio.sleep(0.01)
+    stop.set()
+    await task
+
+
+def test_collector_writes_rows_and_rollups(tmp_path):
+    readings, data = _frames()
+    db_path = str(tmp_path / "telemetry_loop.db")
+    collector = NodeCollector("loop", "loop://", db_path)
+    port = serial.serial_for_url("loop://", timeout=0.05)
+    port.write(data)
+
+    asyncio.run(_collect(collector, port, N_FRAMES))
+    collector.close()
+
+    assert collector.samples == N_FRAMES
+    assert collector.decoder.malformed == 0
+    assert collector.decoder.frames_lost == 0
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT temperature, humidity, moisture, light FROM samples ORDER BY ts, rowid").fetchall()
+    assert rows == readings
+    for resolution in ROLLUP_RESOLUTIONS:
+        n, total, low, high = conn.execute(
+            f"SELECT sum(temperature_n), sum(temperature_sum), min(temperature_min), "
+            f"max(temperature_max) FROM rollup_{resolution}").fetchone()
+        assert n == N_FRAMES
+        assert total == sum(r[0] for r in readings)
+        assert (low, high) == (readings[0][0], readings[-1][0])
+    conn.close()
+
+
+def test_add_does_not_wait_for_a_running_flush(tmp_path):
+    store = TelemetryStore(str(tmp_path / "t.db"), batch_size=float("inf"), flush_interval=float("inf"))
+    done = threading.Event()
+    with store._db_lock:  # Stands in for a commit/fsync in progress on the executor
+        threading.Thread(target=lambda: (store.add(datetime.now(), temperature=1.0), done.set())).start()
+        assert done.wait(1.0)
+    assert store.flush() == 1
+    store.close()
@@ -0,0 +1,275 @@
+"""
+Tiled NDVI/VARI for orthomosaics too large to load in one piece.
+
+RGB and NIR are read in aligned windows, each tile goes through the fused
+kernels in index_kernels, the quantised output is streamed to disk tile by
+tile and only the 256-bin histograms are kept, so peak memory is bounded by
+the tile size. The merged histograms give the same stats dict as
+compute_ndvi_from_images / compute_vari_and_save.
+
+rasterio is required for the bounded-memory guarantee: inputs are read
+with windowed GeoTIFF reads and the outputs are tiled, compressed GeoTIFFs
+carrying the source georeference. Without it, compute_indices_tiled raises
+RuntimeError unless allow_full_decode=True (--allow-full-decode), in which
+case inputs are opened with PIL, which decodes each whole image into memory
+(so only the index computation is tiled), with a warning giving the
+expected size; outputs are then .npy memmaps that
+np.load(..., mmap_mode='r') can open without loading.
+"""
+import os
+import argparse
+from datetime import datetime
+import numpy as np
+from PIL import Image
+from index_kernels import ndvi_kernel, vari_kernel
+from histogram_stats import summarize_histogram, NDVI_LEVEL_CLASSES, VARI_LEVEL_CLASSES
+from results_store import append_result, NDVI_COLUMNS, VARI_COLUMNS
+
+try:
+    import rasterio
+    from rasterio.windows import Window
+except ImportError:
+    rasterio = None
+
+DEFAULT_TILE_SIZE = 2048
+
+
+# ========== Readers ==========
+class _RasterioReader:
+    def __init__(self, path, mode):
+        self.src = rasterio.open(path)
+        self.mode = mode
+        self.width, self.height = self.src.width, self.src.height
+        if self.src.dtypes[0] != 'uint8':
+            raise ValueError(f"{path}: expected 8-bit bands, got {self.src.dtypes[0]}")
+        if mode == 'RGB' and self.src.count < 3:
+            raise ValueError(f"{path}: expected at least 3 bands, got {self.src.count}")
+
+    def read(self, row, col, height, width):
+        window = Window(col, row, width, height)
+        if self.mode == 'RGB':
+            return np.moveaxis(self.src.read((1, 2, 3), window=window), 0, -1)
+        return self.src.read(1, window=window)
+
+    def close(self):
+        self.src.close()
+
+
+class _PILReader:
+    def __init__(self, path, mode):
+        # Orthomosaics trip PIL's decompression-bomb guard; lift it for this open only
+        max_pixels = Image.MAX_IMAGE_PIXELS
+        Image.MAX_IMAGE_PIXELS = None
+        try:
+            self.img = Image.open(path)
+        finally:
+            Image.MAX_IMAGE_PIXELS = max_pixels
+        self.mode = mode
+        self.width, self.height = self.img.size
+
+    def read(self, row, col, height, width):
+        tile = self.img.crop((col, row, col + width, row + height)).convert(self.mode)
+        return np.asarray(tile)
+
+    def close(self):
+        self.img.close()
+
+
+def _open_reader(path, mode, allow_full_decode=False):
+    if rasterio is not None:
+        return _RasterioReader(path, mode)
+    if not allow_full_decode:
+        raise RuntimeError("tiled_analysis needs rasterio for windowed reads (pip install rasterio); "
+                           "pass allow_full_decode=True / --allow-full-decode to decode whole images with PIL")
+    reader = _PILReader(path, mode)
+    bands = 3 if mode == 'RGB' else 1
+    print(f"⚠️ rasterio not installed: decoding all of {os.path.basename(path)} with PIL "
+          f"(~{reader.width * reader.height * bands / 1e6:.1f} MB in memory, not tile-bounded)")
+    return reader
+
+
+# ========== Writers ==========
+class _GeoTiffWriter:
+    extension = ".tif"
+
+    def __init__(self, path, height, width, reference):
+        profile = {
+            "driver": "GTiff", "dtype": "uint8", "count": 1,
+            "height": height, "width": width,
+            "tiled": True, "blockxsize": 256, "blockysize": 256, "compress": "deflate",
+        }
+        if isinstance(reference, _RasterioReader):
+            profile["crs"] = reference.src.crs
+            profile["transform"] = reference.src.transform
+        self.dst = rasterio.open(path, "w", **profile)
+
+    def write(self, row, col, tile):
+        self.dst.write(tile, 1, window=Window(col, row, tile.shape[1], tile.shape[0]))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.dst.close()
+
+
+class _MemmapWriter:
+    extension = ".npy"
+
+    def __init__(self, path, height, width, reference):
+        self.out = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(height, width))
+
+    def write(self, row, col, tile):
+        self.out[row:row + tile.shape[0], col:col + tile.shape[1]] = tile
+
+    def flush(self):
+        # Push finished tiles to disk so dirty pages don't pile up in RAM
+        self.out.flush()
+
+    def close(self):
+        self.out.flush()
+        del self.out
+
+
+def _writer_class():
+    return _GeoTiffWriter if rasterio is not None else _MemmapWriter
+
+
+def iter_tiles(height, width, tile_size):
+    """
+    Yields (row, col, tile_height, tile_width) windows covering the image row by row.
+    """
+    for row in range(0, height, tile_size):
+        for col in range(0, width, tile_size):
+            yield row, col, min(tile_size, height - row), min(tile_size, width - col)
+
+
+def compute_indices_tiled(
+        rgb_image_path,
+        nir_image_path,
+        ndvi_folder='ndvi_outputs_date',
+        vari_folder='vari_outputs_date',
+        ndvi_csv_path='ndvi_analysis_date.csv',
+        vari_csv_path='vari_analysis_date.csv',
+        tile_size=DEFAULT_TILE_SIZE,
+        update_csv=True,
+        verbose=True,
+        allow_full_decode=False
+    ):
+    """
+    Computes NDVI and VARI for an arbitrarily large RGB/NIR pair tile by tile.
+    Needs rasterio unless allow_full_decode=True (see module docstring).
+    Streams both quantised index rasters to disk and returns
+    (ndvi_stats, vari_stats) in the same format as the single-image functions,
+    or (None, None) if an input is missing or the sizes differ.
+    """
+    for path in (rgb_image_path, nir_image_path):
+        if not os.path.exists(path):
+            print(f"❌ Image '{path}' not found.")
+            return None, None
+
+    os.makedirs(ndvi_folder, exist_ok=True)
+    os.makedirs(vari_folder, exist_ok=True)
+
+    rgb_reader = _open_reader(rgb_image_path, 'RGB', allow_full_decode)
+    try:
+        nir_reader = _open_reader(nir_image_path, 'L', allow_full_decode)
+    except Exception:
+        rgb_reader.close()
+        raise
+    ndvi_writer = vari_writer = None
+    try:
+        if (rgb_reader.height, rgb_reader.width) != (nir_reader.height, nir_reader.width):
+            print(f"❌ RGB ({rgb_reader.width}x{rgb_reader.height}) and NIR "
+                  f"({nir_reader.width}x{nir_reader.height}) sizes differ.")
+            return None, None
+
+        height, width = rgb_reader.height, rgb_reader.width
+        base_name = os.path.splitext(os.path.basename(rgb_image_path))[0]
+        writer_class = _writer_class()
+        ndvi_image_name = f"{base_name}_ndvi{writer_class.extension}"
+        vari_image_name = f"vari_{base_name}{writer_class.extension}"
+        ndvi_path = os.path.join(ndvi_folder, ndvi_image_name)
+        vari_path = os.path.join(vari_folder, vari_image_name)
+        ndvi_writer = writer_class(ndvi_path, height, width, rgb_reader)
+        vari_writer = writer_class(vari_path, height, width, rgb_reader)
+
+        # === Process tile by tile, keeping only the histograms ===
+        ndvi_hist = np.zeros(256, dtype=np.int64)
+        vari_hist = np.zeros(256, dtype=np.int64)
+        last_row = 0
+        for row, col, tile_h, tile_w in iter_tiles(height, width, tile_size):
+            if row != last_row:
+                ndvi_writer.flush()
+                vari_writer.flush()
+                last_row = row
+            rgb = rgb_reader.read(row, col, tile_h, tile_w)
+            nir = nir_reader.read(row, col, tile_h, tile_w)
+
+            ndvi_tile, tile_hist = ndvi_kernel(rgb[..., 0], nir)
+            ndvi_hist += tile_hist
+            ndvi_writer.write(row, col, ndvi_tile)
+
+            vari_tile, tile_hist = vari_kernel(rgb)
+            vari_hist += tile_hist
+            vari_writer.write(row, col, vari_tile)
+    finally:
+        for closable in (ndvi_writer, vari_writer, rgb_reader, nir_reader):
+            if closable is not None:
+                closable.close()
+
+    # === Merge tile histograms into the usual stats ===
+    upload_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    mean_ndvi, ndvi_pct = summarize_histogram(ndvi_hist, NDVI_LEVEL_CLASSES)
+    mean_vari, vari_pct = summarize_histogram(vari_hist, VARI_LEVEL_CLASSES)
+    ndvi_stats = {
+        "DateTime": upload_datetime,
+        "RGB Image": os.path.basename(rgb_image_path),
+        "NIR Image": os.path.basename(nir_image_path),
+        "NDVI Image": ndvi_image_name,
+        "Mean NDVI": mean_ndvi,
+        "Healthy (%)": ndvi_pct[0],
+        "Moderate (%)": ndvi_pct[1],
+        "Sparse (%)": ndvi_pct[2],
+        "Non-Vegetated (%)": ndvi_pct[3]
+    }
+    vari_stats = {
+        "DateTime": upload_datetime,
+        "Image Name": os.path.basename(rgb_image_path),
+        "Mean VARI": mean_vari,
+        "Healthy (%)": vari_pct[0],
+        "Moderate (%)": vari_pct[1],
+        "Sparse (%)": vari_pct[2],
+        "Non-Vegetated (%)": vari_pct[3]
+    }
+
+    if update_csv:
+        append_result(ndvi_csv_path, ndvi_stats, NDVI_COLUMNS)
+        append_result(vari_csv_path, vari_stats, VARI_COLUMNS)
+
+    if verbose:
+        print(f"\n🗺️ Tiled analysis of {os.path.basename(rgb_image_path)} ({width}x{height}, "
+              f"tiles of {tile_size}px)")
+        print(f"Mean NDVI: {mean_ndvi:.3f}   Mean VARI: {mean_vari:.3f}")
+        print(f"✅ NDVI raster saved to: {ndvi_path}")
+        print(f"✅ VARI raster saved to: {vari_path}")
+
+    return ndvi_stats, vari_stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tiled NDVI/VARI for large orthomosaics")
+    parser.add_argument("rgb_image")
+    parser.add_argument("nir_image")
+    parser.add_argument("--tile-size", type=int, default=DEFAULT_TILE_SIZE)
+    parser.add_argument("--ndvi-folder", default="ndvi_outputs_date")
+    parser.add_argument("--vari-folder", default="vari_outputs_date")
+    parser.add_argument("--allow-full-decode", action="store_true",
+                        help="Without rasterio, decode whole images with PIL (memory grows with image size)")
+    args = parser.parse_args()
+
+    try:
+        compute_indices_tiled(args.rgb_image, args.nir_image, args.ndvi_folder, args.vari_folder,
+                              tile_size=args.tile_size, allow_full_decode=args.allow_full_decode)
+    except RuntimeError as e:
+        parser.exit(1, f"❌ {e}\n")